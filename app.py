@@ -1,18 +1,22 @@
 
 import sys
+import html
 import json
-import subprocess
+import os
+import time
 from pathlib import Path
 
 import streamlit as st
-import matplotlib.pyplot as plt
-
-# Базы данных
-from astroquery.nasa_exoplanet_archive import NasaExoplanetArchive
-from astroquery.simbad import Simbad
+import streamlit.components.v1 as components
 
 # Физические константы из gravity.py
 from gravity import MS, RS
+import control
+import live
+from lookup_cache import LookupCache, normalize
+from host_table import HostTable
+import queries
+import startup
 
 # =============================
 # Streamlit page config (ВЫЗЫВАЕМ ОДИН РАЗ!)
@@ -51,6 +55,17 @@ h1, h2, h3, h4, h5, h6, p, label, span, div, code, .stMarkdown, .stCaption, .stT
 """
 st.markdown(STAR_CSS, unsafe_allow_html=True)
 
+
+@st.cache_resource
+def _prewarm():
+    """Once per server: load the database clients in the background (start.py --prewarm)."""
+    return startup.prewarm()
+
+
+# astroquery/astropy are only imported by the first database lookup, unless a server asks for them up front
+if os.environ.get("STELLAR_DANCE_PREWARM"):
+    _prewarm()
+
 # =============================
 # 🎓 EDUCATION MODE (with toggle)
 # =============================
@@ -146,10 +161,11 @@ def education_mode():
     with tabs[1]:
         if "quiz_score" not in st.session_state:
             st.session_state.quiz_score = 0
+        quiz = _edu_quiz()
         if "quiz_seen" not in st.session_state:
-            st.session_state.quiz_seen = [False] * len(_edu_quiz())
+            st.session_state.quiz_seen = [False] * len(quiz)
 
-        for i, item in enumerate(_edu_quiz()):
+        for i, item in enumerate(quiz):
             st.markdown(f"**Q{i+1}. {item['q']}**")
             choice = st.radio(
                 "Select one:",
@@ -169,12 +185,12 @@ def education_mode():
                     st.success("✅ Correct!" if correct else "❌ Not quite.")
                     st.info(item["why"])
 
-        total = len(_edu_quiz())
+        total = len(quiz)
         st.markdown(f"**Score:** {st.session_state.quiz_score} / {total}")
         if st.button("🔁 Reset Quiz"):
             st.session_state.quiz_score = 0
             st.session_state.quiz_seen = [False] * total
-            st.rerun()
+            st.rerun(scope="fragment")
 
     with tabs[2]:
         for term, definition in _edu_glossary().items():
@@ -186,12 +202,19 @@ def education_mode():
             st.write(_match_answer(q))
 
 # 🎓 Toggle
-try:
-    show_edu = st.toggle("🎓 Enable Education Mode", value=True, key="edu_toggle")
-except AttributeError:
-    show_edu = st.checkbox("🎓 Enable Education Mode", value=True, key="edu_toggle")
-if show_edu:
-    education_mode()
+# Each section of the page is a fragment: a widget inside one reruns only that section.
+# Sections that change the stars for the others (presets, databases) rerun the whole page.
+@st.fragment
+def education_section():
+    try:
+        show_edu = st.toggle("🎓 Enable Education Mode", value=True, key="edu_toggle")
+    except AttributeError:
+        show_edu = st.checkbox("🎓 Enable Education Mode", value=True, key="edu_toggle")
+    if show_edu:
+        education_mode()
+
+
+education_section()
 
 # =============================
 # Title & Intro
@@ -219,244 +242,327 @@ elif len(st.session_state["stars"]) > num_stars:
 # =============================
 # Presets
 # =============================
-st.subheader("✨ Quick Add: Popular Stars (presets)")
-preset_stars = {
-    "Sun": {"mass": MS, "radius": RS, "color": "#FFD700"},
-    "Sirius A": {"mass": 2.06 * MS, "radius": 1.71 * RS, "color": "#BFD9FF"},
-    "Sirius B": {"mass": 1.02 * MS, "radius": 0.0084 * RS, "color": "#A4A9FF"},
-    "Betelgeuse": {"mass": 20 * MS, "radius": 887 * RS, "color": "#FF4500"},
-    "Proxima Centauri": {"mass": 0.122 * MS, "radius": 0.1542 * RS, "color": "#FF6F91"},
-    "Rigel": {"mass": 21 * MS, "radius": 78.9 * RS, "color": "#87CEFA"},
-}
-col1, col2 = st.columns(2)
-with col1:
-    preset_choice = st.selectbox("Select a preset star:", list(preset_stars.keys()))
-with col2:
-    star_target = st.selectbox("Apply to which star?", [f"Star {i+1}" for i in range(num_stars)])
-if st.button("Add preset star"):
-    idx = int(star_target.split()[-1]) - 1
-    sel = preset_stars[preset_choice]
-
-    # ✅ Обновляем “модель” данных
-    st.session_state["stars"][idx]["mass"] = float(sel["mass"])
-    st.session_state["stars"][idx]["radius"] = float(sel["radius"])
-    st.session_state["stars"][idx]["color"] = sel["color"]
-
-    # ✅ Синхронизируем виджеты (важно, иначе останутся старые значения)
-    st.session_state[f"mass_{idx}"] = float(sel["mass"])
-    st.session_state[f"radius_{idx}"] = float(sel["radius"])
-    st.session_state[f"color_{idx}"] = sel["color"]
-
-    st.success(f"✅ Applied parameters: {preset_choice} → {star_target}")
-    st.rerun()
+@st.fragment
+def presets_section(num_stars: int):
+    st.subheader("✨ Quick Add: Popular Stars (presets)")
+    preset_stars = {
+        "Sun": {"mass": MS, "radius": RS, "color": "#FFD700"},
+        "Sirius A": {"mass": 2.06 * MS, "radius": 1.71 * RS, "color": "#BFD9FF"},
+        "Sirius B": {"mass": 1.02 * MS, "radius": 0.0084 * RS, "color": "#A4A9FF"},
+        "Betelgeuse": {"mass": 20 * MS, "radius": 887 * RS, "color": "#FF4500"},
+        "Proxima Centauri": {"mass": 0.122 * MS, "radius": 0.1542 * RS, "color": "#FF6F91"},
+        "Rigel": {"mass": 21 * MS, "radius": 78.9 * RS, "color": "#87CEFA"},
+    }
+    col1, col2 = st.columns(2)
+    with col1:
+        preset_choice = st.selectbox("Select a preset star:", list(preset_stars.keys()))
+    with col2:
+        star_target = st.selectbox("Apply to which star?", [f"Star {i+1}" for i in range(num_stars)])
+    if st.button("Add preset star"):
+        idx = int(star_target.split()[-1]) - 1
+        sel = preset_stars[preset_choice]
+
+        # ✅ Обновляем “модель” данных
+        st.session_state["stars"][idx]["mass"] = float(sel["mass"])
+        st.session_state["stars"][idx]["radius"] = float(sel["radius"])
+        st.session_state["stars"][idx]["color"] = sel["color"]
+
+        # ✅ Синхронизируем виджеты (важно, иначе останутся старые значения)
+        st.session_state[f"mass_{idx}"] = float(sel["mass"])
+        st.session_state[f"radius_{idx}"] = float(sel["radius"])
+        st.session_state[f"color_{idx}"] = sel["color"]
+
+        st.success(f"✅ Applied parameters: {preset_choice} → {star_target}")
+        st.rerun()
+
+
+presets_section(num_stars)
 
 # =============================
 # Databases: NASA & SIMBAD
 # =============================
-# =============================
-# Databases: NASA & SIMBAD
-# =============================
-st.subheader("🛰️ Databases")
-tab_nasa, tab_simbad = st.tabs(["NASA Exoplanet Archive", "SIMBAD"])
 
 
-def fetch_star_params_from_nasa(hostname: str):
+@st.cache_resource
+def _nasa_cache() -> LookupCache:
+    """Host star lookups shared by all sessions and kept on disk between app runs."""
+    return LookupCache(Path.home() / ".stellar_dance" / "nasa_hosts.json")
+
+
+HOST_TABLE_PATH = Path.home() / ".stellar_dance" / "host_stars.npz"
+
+
+@st.cache_resource
+def _host_table() -> HostTable | None:
+    """The local host star table, when it has been downloaded."""
+    try:
+        return HostTable.load(HOST_TABLE_PATH)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def fetch_star_params_from_nasa(hostname: str, offline: bool = False):
     """
-    Query Planetary Systems tables (PS/PSComppars) for host star mass/radius.
+    Host star mass/radius from the local host table if there is one, else (or for hosts
+    added since the table was downloaded) from the Planetary Systems tables, cached by
+    normalized hostname. Offline, only the table and the cache are used.
     Returns (mass_kg, radius_m, resolved_hostname). Raises ValueError if not found.
     """
     name = (hostname or "").strip()
     if not name:
         raise ValueError("Empty star name.")
-    tables = ("pscomppars", "ps")
-    select = "hostname,st_mass,st_rad"
-    for table in tables:
-        res = NasaExoplanetArchive.query_criteria(
-            table=table, select=select, where=f"upper(hostname)=upper('{name}')"
-        )
-        if len(res) == 0:
-            res = NasaExoplanetArchive.query_criteria(
-                table=table, select=select, where=f"upper(hostname) LIKE upper('{name}%')"
-            )
-        if len(res) > 0:
-            df = res.to_pandas().dropna(subset=["st_mass", "st_rad"])
-            if not df.empty:
-                row = df.iloc[0]
-                return float(row["st_mass"]) * MS, float(row["st_rad"]) * RS, str(row["hostname"])
-    raise ValueError("No mass/radius found for this hostname in PS tables.")
-
-
-with tab_nasa:
-    c1, c2 = st.columns([2, 1])
-    with c1:
-        nasa_name = st.text_input("Host star name (e.g., Kepler-10, HD 209458, WASP-12)")
-    with c2:
-        nasa_apply_to = st.selectbox("Apply to:", [f"Star {i+1}" for i in range(num_stars)], key="nasa_apply")
-
-    if st.button("🔍 Fetch from NASA", key="btn_nasa_fetch"):
+    table = _host_table()
+    if table is not None:
         try:
-            m, r, resolved = fetch_star_params_from_nasa(nasa_name)
-            idx = int(nasa_apply_to.split()[-1]) - 1
-
-            # модель
-            st.session_state["stars"][idx]["mass"] = float(m)
-            st.session_state["stars"][idx]["radius"] = float(r)
-            st.session_state["stars"][idx]["color"] = "#FFD700"
-
-            # синхронизация виджетов
-            st.session_state[f"mass_{idx}"] = float(m)
-            st.session_state[f"radius_{idx}"] = float(r)
-            st.session_state[f"color_{idx}"] = "#FFD700"
-
-            st.success(f"✅ NASA PS data loaded for {resolved} → Star {idx+1}")
-            st.info(f"Mass: {m:.3e} kg   |   Radius: {r:.3e} m")
-            st.rerun()
-        except Exception as e:
-            st.error(f"⚠️ NASA query failed: {e}")
-            st.caption("Tip: try the system name (hostname), e.g., 'Kepler-10' or 'HD 209458'.")
-
-
-with tab_simbad:
-    c1, c2 = st.columns([2, 1])
-    with c1:
-        simbad_name = st.text_input("Object name (e.g., Vega, Rigel, Betelgeuse)")
-    with c2:
-        simbad_apply_to = st.selectbox("Apply to:", [f"Star {i+1}" for i in range(num_stars)], key="simbad_apply")
-
-    if st.button("🔭 Query SIMBAD", key="btn_simbad_query"):
-        try:
-            s = Simbad()
-            s.add_votable_fields("sptype", "flux(V)")
-            result = s.query_object(simbad_name)
-            if result is None or len(result) == 0:
-                st.error("❌ Not found in SIMBAD.")
+            resolved, mass, radius = table.resolve(name)
+            return mass * MS, radius * RS, resolved
+        except ValueError:
+            pass  # not in the downloaded copy; the archive may know it by now
+    resolved, mass, radius = _nasa_cache().lookup(normalize(name), lambda: queries.nasa_host(name), offline)
+    return mass * MS, radius * RS, resolved
+
+
+@st.cache_resource
+def _simbad_cache() -> LookupCache:
+    """SIMBAD spectral types shared by all sessions and kept on disk between app runs."""
+    return LookupCache(Path.home() / ".stellar_dance" / "simbad_sptypes.json")
+
+
+def estimate_from_spectral_type(sp: str | None):
+    """Rough (mass_kg, radius_m) of a main-sequence star of spectral type sp; the Sun for unknown types."""
+    spectral_map = {
+        "O": (16*MS, 6.6*RS),
+        "B": (2.1*MS, 2.0*RS),
+        "A": (1.75*MS, 1.7*RS),
+        "F": (1.3*MS, 1.3*RS),
+        "G": (1.0*MS, 1.0*RS),
+        "K": (0.8*MS, 0.9*RS),
+        "M": (0.4*MS, 0.5*RS),
+    }
+    if sp and sp[0] in spectral_map:
+        return spectral_map[sp[0]]
+    return 1.0 * MS, 1.0 * RS
+
+
+def _apply_star(idx: int, mass: float, radius: float) -> None:
+    # модель
+    st.session_state["stars"][idx]["mass"] = float(mass)
+    st.session_state["stars"][idx]["radius"] = float(radius)
+    st.session_state["stars"][idx]["color"] = "#FFD700"
+
+    # синхронизация виджетов
+    st.session_state[f"mass_{idx}"] = float(mass)
+    st.session_state[f"radius_{idx}"] = float(radius)
+    st.session_state[f"color_{idx}"] = "#FFD700"
+
+
+@st.fragment
+def databases_section(num_stars: int):
+    st.subheader("🛰️ Databases")
+    tab_nasa, tab_simbad = st.tabs(["NASA Exoplanet Archive", "SIMBAD"])
+
+    with tab_nasa:
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            nasa_name = st.text_input("Host star name (e.g., Kepler-10, HD 209458, WASP-12)")
+        with c2:
+            nasa_apply_to = st.selectbox("Apply to:", [f"Star {i+1}" for i in range(num_stars)], key="nasa_apply")
+        host_table = _host_table()
+        if host_table is not None:
+            # the selectbox filters its options in the browser while typing; a text input only reruns on Enter
+            picked = st.selectbox("Or pick a host from the local table (type to filter):", host_table.names,
+                                  index=None, placeholder="Search hosts...", key="nasa_pick")
+            nasa_name = picked or nasa_name
+        nasa_offline = st.checkbox("Offline: use cached lookups only", key="nasa_offline",
+                                   help="Earlier lookups are remembered on disk, so they also work without internet.")
+
+        t1, t2 = st.columns([2, 1])
+        with t1:
+            if host_table is None:
+                st.caption("Download the host star table once to search offline and pick hosts from a list.")
             else:
-                sp = result["SP_TYPE"][0].decode() if "SP_TYPE" in result.colnames and result["SP_TYPE"][0] is not None else "Unknown"
-                spectral_map = {
-                    "O": (16*MS, 6.6*RS),
-                    "B": (2.1*MS, 2.0*RS),
-                    "A": (1.75*MS, 1.7*RS),
-                    "F": (1.3*MS, 1.3*RS),
-                    "G": (1.0*MS, 1.0*RS),
-                    "K": (0.8*MS, 0.9*RS),
-                    "M": (0.4*MS, 0.5*RS),
-                }
-                if sp and sp[0] in spectral_map:
-                    mass, radius = spectral_map[sp[0]]
+                age = (time.time() - host_table.downloaded) / 86400
+                st.caption(f"Local host table: {len(host_table)} stars, downloaded {age:.0f} days ago.")
+        with t2:
+            if st.button("⬇️ Download table" if host_table is None else "🔄 Refresh table", key="btn_nasa_table"):
+                try:
+                    with st.spinner("Downloading host stars from the NASA Exoplanet Archive..."):
+                        HostTable.download(HOST_TABLE_PATH)
+                    _host_table.clear()
+                    st.rerun()
+                except Exception as e:
+                    st.error(f"⚠️ Download failed: {e}")
+
+        if st.button("🔍 Fetch from NASA", key="btn_nasa_fetch"):
+            try:
+                m, r, resolved = fetch_star_params_from_nasa(nasa_name, offline=nasa_offline)
+                idx = int(nasa_apply_to.split()[-1]) - 1
+                _apply_star(idx, m, r)
+
+                st.success(f"✅ NASA PS data loaded for {resolved} → Star {idx+1}")
+                st.info(f"Mass: {m:.3e} kg   |   Radius: {r:.3e} m")
+                st.rerun()
+            except Exception as e:
+                st.error(f"⚠️ NASA query failed: {e}")
+                st.caption("Tip: try the system name (hostname), e.g., 'Kepler-10' or 'HD 209458'.")
+
+
+    with tab_simbad:
+        c1, c2 = st.columns([2, 1])
+        with c1:
+            simbad_name = st.text_input("Object name (e.g., Vega, Rigel, Betelgeuse)")
+        with c2:
+            simbad_apply_to = st.selectbox("Apply to:", [f"Star {i+1}" for i in range(num_stars)], key="simbad_apply")
+
+        if st.button("🔭 Query SIMBAD", key="btn_simbad_query"):
+            try:
+                types = queries.simbad_spectral_types([simbad_name.strip()], _simbad_cache())
+                if not types:
+                    st.error("❌ Not found in SIMBAD.")
                 else:
-                    mass, radius = 1.0 * MS, 1.0 * RS
-
-                idx = int(simbad_apply_to.split()[-1]) - 1
-
-                # модель
-                st.session_state["stars"][idx]["mass"] = float(mass)
-                st.session_state["stars"][idx]["radius"] = float(radius)
-                st.session_state["stars"][idx]["color"] = "#FFD700"
+                    sp = types[simbad_name.strip()] or "Unknown"
+                    mass, radius = estimate_from_spectral_type(sp)
+                    idx = int(simbad_apply_to.split()[-1]) - 1
+                    _apply_star(idx, mass, radius)
+
+                    st.success(f"✅ SIMBAD: {simbad_name} (SpT {sp}) → Star {idx+1}")
+                    st.info(f"Estimated Mass: {mass:.3e} kg   |   Estimated Radius: {radius:.3e} m")
+                    st.rerun()
+            except Exception as e:
+                st.error(f"⚠️ SIMBAD query failed: {type(e).__name__}: {e}")
+
+        st.markdown("**All stars at once**")
+        batch_names = st.text_input(f"Names for Star 1–{num_stars}, comma separated (e.g., Alpha Cen A, Alpha Cen B)",
+                                    key="simbad_batch_names")
+        if st.button("🔭 Resolve all in one request", key="btn_simbad_batch"):
+            names = [n.strip() for n in batch_names.split(",") if n.strip()][:num_stars]
+            try:
+                types = queries.simbad_spectral_types(names, _simbad_cache())
+                for idx, name in enumerate(names):
+                    if name in types:
+                        _apply_star(idx, *estimate_from_spectral_type(types[name]))
+                unknown = [n for n in names if n not in types]
+                if unknown:
+                    st.warning(f"Not found in SIMBAD: {', '.join(unknown)}. Those stars were left unchanged.")
+                else:
+                    st.rerun()
+            except Exception as e:
+                st.error(f"⚠️ SIMBAD query failed: {type(e).__name__}: {e}")
 
-                # синхронизация виджетов
-                st.session_state[f"mass_{idx}"] = float(mass)
-                st.session_state[f"radius_{idx}"] = float(radius)
-                st.session_state[f"color_{idx}"] = "#FFD700"
 
-                st.success(f"✅ SIMBAD: {simbad_name} (SpT {sp}) → Star {idx+1}")
-                st.info(f"Estimated Mass: {mass:.3e} kg   |   Estimated Radius: {radius:.3e} m")
-                st.rerun()
-        except Exception as e:
-            st.error(f"⚠️ SIMBAD query failed: {type(e).__name__}: {e}")
+databases_section(num_stars)
 
 # =============================
 # Custom manual inputs
 # =============================
-st.subheader("🪐 Enter Custom Star Parameters")
-for i in range(num_stars):
-    st.markdown(f"### Star {i + 1}")
-    st.session_state["stars"][i]["mass"] = st.number_input(
-        f"Mass of Star {i + 1} (kg)",
-        min_value=float(1e20),
-        max_value=float(1e33),
-        value=float(st.session_state["stars"][i]["mass"]),
-        key=f"mass_{i}", step=10_000_000.0
-
-    )
-    st.session_state["stars"][i]["radius"] = st.number_input(
-        f"Radius of Star {i + 1} (m)",
-        min_value=float(1e3),
-        max_value=float(1e12),
-        value=float(st.session_state["stars"][i]["radius"]),
-        key=f"radius_{i}", step=10_000_000.0
+@st.fragment
+def parameter_editor(num_stars: int):
+    drawn = [(s["radius"], s["color"]) for s in st.session_state["stars"]]
+    st.subheader("🪐 Enter Custom Star Parameters")
+    for i in range(num_stars):
+        st.markdown(f"### Star {i + 1}")
+        st.session_state["stars"][i]["mass"] = st.number_input(
+            f"Mass of Star {i + 1} (kg)",
+            min_value=float(1e20),
+            max_value=float(1e33),
+            value=float(st.session_state["stars"][i]["mass"]),
+            key=f"mass_{i}", step=10_000_000.0
 
-    )
-    st.session_state["stars"][i]["color"] = st.color_picker(
-        f"Color of Star {i + 1}",
-        st.session_state["stars"][i]["color"],
-        key=f"color_{i}"
-    )
+        )
+        st.session_state["stars"][i]["radius"] = st.number_input(
+            f"Radius of Star {i + 1} (m)",
+            min_value=float(1e3),
+            max_value=float(1e12),
+            value=float(st.session_state["stars"][i]["radius"]),
+            key=f"radius_{i}", step=10_000_000.0
 
-# =============================
-# 📊 Current Star Parameters (Auto-updating)
-# =============================
-st.markdown("---")
-st.subheader("📊 Current Star Parameters")
-if "stars" in st.session_state and len(st.session_state["stars"]) > 0:
-    for i, s in enumerate(st.session_state["stars"], start=1):
-        try:
-            m_sol = s["mass"] / MS
-            r_sol = s["radius"] / RS
-        except Exception:
-            m_sol, r_sol = float("nan"), float("nan")
-        st.markdown(
-            f"**Star {i}**  \n"
-            f"- Mass: {m_sol:.3g} M☉  \n"
-            f"- Radius: {r_sol:.3g} R☉  \n"
-            f"- Color: `{s.get('color', '#FFFFFF')}`"
         )
-else:
-    st.info("No star data yet. Load or apply parameters first.")
+        st.session_state["stars"][i]["color"] = st.color_picker(
+            f"Color of Star {i + 1}",
+            st.session_state["stars"][i]["color"],
+            key=f"color_{i}"
+        )
+
+    # =============================
+    # 📊 Current Star Parameters (Auto-updating)
+    # =============================
+    st.markdown("---")
+    st.subheader("📊 Current Star Parameters")
+    if "stars" in st.session_state and len(st.session_state["stars"]) > 0:
+        for i, s in enumerate(st.session_state["stars"], start=1):
+            try:
+                m_sol = s["mass"] / MS
+                r_sol = s["radius"] / RS
+            except Exception:
+                m_sol, r_sol = float("nan"), float("nan")
+            st.markdown(
+                f"**Star {i}**  \n"
+                f"- Mass: {m_sol:.3g} M☉  \n"
+                f"- Radius: {r_sol:.3g} R☉  \n"
+                f"- Color: `{s.get('color', '#FFFFFF')}`"
+            )
+    else:
+        st.info("No star data yet. Load or apply parameters first.")
+
+    # the preview only shows radii and colors; a mass edit stays inside this fragment
+    if [(s["radius"], s["color"]) for s in st.session_state["stars"]] != drawn:
+        st.rerun()
+
+
+parameter_editor(num_stars)
 
 # =============================
 # Time speed (1000 — 70 000)
 # =============================
-st.subheader("⏱️ Simulation Time Speed")
-time_speed = st.slider(
-    "Adjust simulation speed (higher = faster orbits)",
-    min_value=1000, max_value=70000, value=5000, step=500
-)
+@st.fragment
+def time_speed_section():
+    st.subheader("⏱️ Simulation Time Speed")
+    st.slider(
+        "Adjust simulation speed (higher = faster orbits)",
+        min_value=1000, max_value=70000, value=5000, step=500, key="time_speed"
+    )
+
+
+time_speed_section()
 
 # =============================
-# 🌌 Static System Preview (Matplotlib)
+# 🌌 Static System Preview (SVG)
 # =============================
-st.subheader("🌌 System Preview")
-fig, ax = plt.subplots(figsize=(5, 5))
-ax.set_facecolor("white")
-
-positions = [-1, 1, 0] if num_stars == 3 else [-0.6, 0.6]
-max_radius = max(star["radius"] for star in st.session_state["stars"])
-scale = 0.4 / (max_radius / RS) if max_radius > 0 else 0.2
-scale = max(min(scale, 0.4), 0.05)
-
-for i in range(num_stars):
-    orbit = plt.Circle((0, 0), abs(positions[i]), color="gray", linestyle="--", linewidth=0.6, fill=False)
-    ax.add_patch(orbit)
-
-for i in range(num_stars):
-    star = st.session_state["stars"][i]
-    radius_scaled = (star["radius"] / RS) * scale
-    radius_scaled = min(radius_scaled, 0.5)
-    circle = plt.Circle((positions[i], 0), radius_scaled, color=star["color"], ec="black", lw=0.5)
-    ax.add_patch(circle)
-    ax.text(positions[i], -0.25 - radius_scaled, f"Star {i+1}", color="black", ha="center", fontsize=10, weight="bold")
-
-ax.set_xlim(-2, 2)
-ax.set_ylim(-1.5, 1.5)
-ax.set_aspect("equal", "box")
-ax.axis("off")
-st.pyplot(fig)
+@st.cache_data(max_entries=256)
+def _preview_svg(radii: tuple, colors: tuple) -> str:
+    """SVG drawing of the stars side by side on schematic orbits; cached per radii and colors."""
+    positions = [-1, 1, 0] if len(radii) == 3 else [-0.6, 0.6]
+    max_radius = max(radii)
+    scale = 0.4 / (max_radius / RS) if max_radius > 0 else 0.2
+    scale = max(min(scale, 0.4), 0.05)
+
+    parts = ['<svg xmlns="http://www.w3.org/2000/svg" viewBox="-2 -1.5 4 3" style="width:100%;max-width:500px">',
+             '<rect x="-2" y="-1.5" width="4" height="3" fill="white"/>']
+    for x in positions:
+        parts.append(f'<circle cx="0" cy="0" r="{abs(x)}" fill="none" stroke="gray" '
+                     f'stroke-width="0.008" stroke-dasharray="0.05 0.03"/>')
+    for i, (x, radius, color) in enumerate(zip(positions, radii, colors)):
+        r = min((radius / RS) * scale, 0.5)
+        parts.append(f'<circle cx="{x}" cy="0" r="{r:.4f}" fill="{html.escape(color)}" stroke="black" stroke-width="0.01"/>')
+        parts.append(f'<text x="{x}" y="{0.25 + r:.4f}" font-size="0.12" font-weight="bold" font-family="sans-serif" '
+                     f'text-anchor="middle" fill="black">Star {i + 1}</text>')
+    parts.append("</svg>")
+    return "".join(parts)
+
+
+@st.fragment
+def system_preview(num_stars: int):
+    st.subheader("🌌 System Preview")
+    stars = st.session_state["stars"][:num_stars]
+    svg = _preview_svg(tuple(float(s["radius"]) for s in stars), tuple(s["color"] for s in stars))
+    st.markdown(svg, unsafe_allow_html=True)
+
+
+system_preview(num_stars)
 
 # =============================
 # 🌀 Simulation Control (External / Pygame)
 # =============================
-st.markdown("### 🌀 Simulation Control")
-
 def _base_dir() -> Path:
     if getattr(sys, "frozen", False) and hasattr(sys, "_MEIPASS"):
         return Path(sys._MEIPASS)
@@ -466,26 +572,92 @@ BASE_DIR = _base_dir()
 GRAVITY_PY = (BASE_DIR / "gravity.py").resolve()
 CONFIG_JSON = (BASE_DIR / "user_stars.json").resolve()
 
-st.caption("Opens a separate Pygame window for the desktop simulation (faster, with zoom/pan).")
-if not GRAVITY_PY.exists():
-    st.error(f"gravity.py not found at: {GRAVITY_PY}")
 
-if st.button("🚀 Launch Pygame Window", key="run_pygame_btn"):
-    try:
-        st.info("Launching Pygame visualization...")
-        cfg = {
-            "stars": st.session_state["stars"],
-            "time_speed": int(time_speed),
-            "system_type": "binary" if num_stars == 2 else "triple",
-        }
-        with open(CONFIG_JSON, "w", encoding="utf-8") as f:
-            json.dump(cfg, f)
-
-        py = sys.executable or "python"
-        subprocess.Popen([py, str(GRAVITY_PY), str(CONFIG_JSON)], cwd=str(BASE_DIR))
-        st.success("Simulation launched! 🪐")
-    except Exception as e:
-        st.error(f"Launch failed: {type(e).__name__}: {e}")
+def _sim_config(num_stars: int) -> dict:
+    return {
+        "stars": st.session_state["stars"],
+        "time_speed": int(st.session_state["time_speed"]),
+        "system_type": "binary" if num_stars == 2 else "triple",
+    }
+
+
+@st.fragment
+def simulation_control(num_stars: int):
+    st.markdown("### 🌀 Simulation Control")
+    st.caption("Opens a separate Pygame window for the desktop simulation (faster, with zoom/pan). "
+               "The window stays open between launches and picks up the new parameters.")
+    if not GRAVITY_PY.exists():
+        st.error(f"gravity.py not found at: {GRAVITY_PY}")
+
+    if st.button("🚀 Launch Pygame Window", key="run_pygame_btn"):
+        try:
+            cfg = _sim_config(num_stars)
+            with open(CONFIG_JSON, "w", encoding="utf-8") as f:
+                json.dump(cfg, f)
+
+            py = sys.executable or "python"
+            # one simulator window serves every launch of this app instance (start.py gives each
+            # instance its own control port); only the first launch starts a process
+            control.ensure_server([py, str(GRAVITY_PY), "--serve", str(control.DEFAULT_PORT)], cwd=str(BASE_DIR))
+            control.send({"cmd": "load", "config": cfg})
+            st.success("Simulation launched! 🪐")
+        except Exception as e:
+            st.error(f"Launch failed: {type(e).__name__}: {e}")
+
+    pause_col, resume_col, reset_col, stop_col = st.columns(4)
+    for col, label, cmd in ((pause_col, "⏸ Pause", "pause"), (resume_col, "▶ Resume", "resume"),
+                            (reset_col, "↺ Reset", "reset"), (stop_col, "⏹ Close window", "shutdown")):
+        if col.button(label, key=f"sim_{cmd}_btn"):
+            try:
+                control.send({"cmd": cmd})
+            except OSError:
+                st.warning("No simulation window is running.")
+
+    if st.button("Apply time speed to running window", key="sim_speed_btn"):
+        try:
+            reply = control.send({"cmd": "set", "time_speed": int(st.session_state["time_speed"])})
+            if not reply["ok"]:
+                st.error(reply["error"])
+        except OSError:
+            st.warning("No simulation window is running.")
+
+
+simulation_control(num_stars)
+
+# =============================
+# 🌐 Live Simulation (in the browser)
+# =============================
+live_canvas = components.declare_component("live_canvas", path=str(BASE_DIR / "live_canvas"))
+
+
+@st.fragment(run_every=1.0)
+def live_section(num_stars: int):
+    """Pulls the frames produced since the last run; only this part of the page reruns every second."""
+    st.markdown("### 🌐 Live Simulation")
+    st.caption("Runs the simulation on the server and streams it here; works without a desktop window.")
+    live_cfg = _sim_config(num_stars)
+    start_col, stop_col = st.columns(2)
+    if start_col.button("▶ Start live simulation", key="live_start_btn"):
+        if "live" in st.session_state:
+            st.session_state["live"].stop()
+        st.session_state["live"] = live.LiveSimulation(live_cfg)
+        st.session_state["live_cursor"] = -1
+    if stop_col.button("⏹ Stop", key="live_stop_btn") and "live" in st.session_state:
+        st.session_state.pop("live").stop()
+
+    sim = st.session_state.get("live")
+    if sim is None:
+        return
+    if sim.config != live_cfg:
+        st.caption("Parameters changed; press Start to restart the live simulation with them.")
+    last, frames = sim.fetch(st.session_state["live_cursor"])
+    st.session_state["live_cursor"] = last
+    live_canvas(batch=live.encode(frames), last=last, run=sim.id, height=420, key="live_canvas", default=None)
+    if not sim.running:
+        st.caption("The live simulation stopped after being idle; press Start to run it again.")
+
+
+live_section(num_stars)
 
 st.markdown("---")
 st.caption("Created by Team Stellar Dance for NASA Space Apps Challenge 🌠")
@@ -0,0 +1,147 @@
+from __future__ import annotations
+import numpy as np
+
+MAX_DEPTH = 21  # 2 * 21 bits of Morton key fit in an int64
+LEAF_SIZE = 8   # a node with this many stars or fewer is not subdivided
+
+
+class QuadTree:
+    """Flat, level-ordered quadtree over star positions, rebuilt every tick.
+
+    Nodes are stored as arrays; the stars of a node occupy the range
+    [start, end) of `order`, children of a node are contiguous.
+    """
+
+    def __init__(self, pos: np.ndarray, mass: np.ndarray, r: np.ndarray, leaf_size: int = LEAF_SIZE) -> None:
+        n = len(mass)
+        lo = pos.min(axis=0)
+        size = float((pos.max(axis=0) - lo).max()) * (1 + 1e-9) or 1.0
+        cells = 1 << MAX_DEPTH
+        ij = np.minimum(((pos - lo) / size * cells).astype(np.int64), cells - 1)
+        keys = _interleave(ij[:, 0]) | (_interleave(ij[:, 1]) << 1)
+
+        self.order = np.argsort(keys, kind="stable")
+        keys = keys[self.order]
+        ij = ij[self.order]
+        smass = mass[self.order]
+        spos = pos[self.order]
+        sr = r[self.order]
+
+        levels = []
+        active = np.ones(n, dtype=bool)
+        for lvl in range(MAX_DEPTH + 1):
+            prefix = keys >> (2 * (MAX_DEPTH - lvl))
+            new_run = np.ones(n, dtype=bool)
+            new_run[1:] = prefix[1:] != prefix[:-1]
+            run_id = np.cumsum(new_run) - 1
+            starts = np.flatnonzero(new_run)
+            ends = np.append(starts[1:], n)
+            keep = active[starts]
+            if not keep.any():
+                break
+            # reduce over every run first: reduceat on the kept starts alone would span the dropped ones
+            m = np.add.reduceat(smass, starts)[keep]
+            com = np.add.reduceat(spos * smass[:, None], starts)[keep] / m[:, None]
+            rmax = np.maximum.reduceat(sr, starts)[keep]
+            starts, ends = starts[keep], ends[keep]
+            leaf = (ends - starts <= leaf_size) | (lvl == MAX_DEPTH)
+            side = size / (1 << lvl)
+            corner = lo + (ij[starts] >> (MAX_DEPTH - lvl)) * side
+            levels.append((starts, ends, leaf, m, com, corner, np.full(len(starts), side), rmax))
+
+            open_run = np.zeros(run_id[-1] + 1, dtype=bool)
+            open_run[run_id[starts]] = ~leaf
+            active = open_run[run_id]
+
+        self.start, self.end, self.leaf, self.mass, self.com, self.corner, self.side, self.rmax = (
+            np.concatenate(col) for col in zip(*levels)
+        )
+        # children of a node at one level are the runs of the next level inside its star range
+        self.first_child = np.zeros(len(self.mass), dtype=np.int64)
+        self.n_child = np.zeros(len(self.mass), dtype=np.int64)
+        offset = 0
+        for this, nxt in zip(levels, levels[1:]):
+            size_this = len(this[0])
+            lo_c = np.searchsorted(nxt[0], this[0])
+            hi_c = np.searchsorted(nxt[0], this[1])
+            opened = ~this[2]
+            sl = slice(offset, offset + size_this)
+            self.first_child[sl] = np.where(opened, offset + size_this + lo_c, 0)
+            self.n_child[sl] = np.where(opened, hi_c - lo_c, 0)
+            offset += size_this
+
+
+def _interleave(v: np.ndarray) -> np.ndarray:
+    """Spread the bits of v so that bit b moves to bit 2b."""
+    v = v & 0xFFFFFFFF
+    v = (v | (v << 16)) & 0x0000FFFF0000FFFF
+    v = (v | (v << 8)) & 0x00FF00FF00FF00FF
+    v = (v | (v << 4)) & 0x0F0F0F0F0F0F0F0F
+    v = (v | (v << 2)) & 0x3333333333333333
+    v = (v | (v << 1)) & 0x5555555555555555
+    return v
+
+
+def _expand(first: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    """Concatenation of the ranges [first, first + counts)."""
+    total = int(counts.sum())
+    run_start = np.cumsum(counts) - counts
+    return np.repeat(first - run_start, counts) + np.arange(total)
+
+
+def tree_forces(pos: np.ndarray, mass: np.ndarray, r: np.ndarray, G: float, theta: float = 0.5,
+                reach: float = 1.0) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Barnes-Hut accelerations for every star.
+
+    A node is replaced by its centre of mass when side / distance < theta.
+    Nodes closer than reach * (r_i + largest radius in the node) are always
+    opened, so every pair that could touch ends up in a leaf-leaf direct sum.
+    Returns (acc, i, j, d) where i, j, d list those direct pairs with i < j,
+    sorted like a nested (i, j) loop.
+    """
+    n = len(mass)
+    acc = np.zeros((n, 2))
+    tree = QuadTree(pos, mass, r)
+    near_i, near_j = [], []
+
+    p = np.arange(n)
+    q = np.zeros(n, dtype=np.int64)
+    while len(p):
+        dif = tree.com[q] - pos[p]
+        d = np.hypot(dif[:, 0], dif[:, 1])
+        gap = np.maximum(tree.corner[q] - pos[p], 0) + np.maximum(pos[p] - tree.corner[q] - tree.side[q, None], 0)
+        box_dist = np.hypot(gap[:, 0], gap[:, 1])
+        far = (box_dist > reach * (r[p] + tree.rmax[q])) & (tree.side[q] < theta * d)
+
+        if far.any():
+            w = G * tree.mass[q[far]] / d[far] ** 3
+            acc[:, 0] += np.bincount(p[far], w * dif[far, 0], minlength=n)
+            acc[:, 1] += np.bincount(p[far], w * dif[far, 1], minlength=n)
+
+        leaf = ~far & tree.leaf[q]
+        if leaf.any():
+            counts = tree.end[q[leaf]] - tree.start[q[leaf]]
+            i = np.repeat(p[leaf], counts)
+            j = tree.order[_expand(tree.start[q[leaf]], counts)]
+            other = i != j
+            near_i.append(i[other])
+            near_j.append(j[other])
+
+        opened = ~far & ~tree.leaf[q]
+        counts = tree.n_child[q[opened]]
+        p = np.repeat(p[opened], counts)
+        q = _expand(tree.first_child[q[opened]], counts)
+
+    i = np.concatenate(near_i) if near_i else np.zeros(0, dtype=np.int64)
+    j = np.concatenate(near_j) if near_j else np.zeros(0, dtype=np.int64)
+    dif = pos[j] - pos[i]
+    d = np.hypot(dif[:, 0], dif[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(d > 0, G * mass[j] / d ** 3, 0.0)
+    acc[:, 0] += np.bincount(i, w * dif[:, 0], minlength=n)
+    acc[:, 1] += np.bincount(i, w * dif[:, 1], minlength=n)
+
+    upper = i < j
+    i, j, d = i[upper], j[upper], d[upper]
+    srt = np.lexsort((j, i))
+    return acc, i[srt], j[srt], d[srt]
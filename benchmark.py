@@ -0,0 +1,226 @@
+"""Benchmarks for the gravity.py physics kernels, run headless.
+
+    python benchmark.py --out bench.json
+    python benchmark.py --only three_body cluster_1000 --integrator hermite
+    python benchmark.py --out bench_new.json --compare bench.json
+    python benchmark.py --block-vs-hermite
+
+Every scenario reports ticks/s, force evaluations/s, peak memory and the relative
+drift of total energy and angular momentum, so speed-ups can be checked for accuracy.
+--block-vs-hermite runs scenarios with both Hermite schemes and compares their force
+evaluations (default: three_body and binary_in_cluster).
+"""
+from __future__ import annotations
+import argparse
+import datetime
+import json
+import math
+import platform
+import time
+import tracemalloc
+
+import numpy as np
+
+import gravity
+
+# the example configs from the README
+BINARY_EXAMPLE = {
+    "time_speed": 5000,
+    "stars": [
+        {"mass": 1.989e30, "radius": 6.957e8, "color": "#FFD700"},
+        {"mass": 2.06e30, "radius": 1.71e9, "color": "#BFD9FF"},
+    ],
+}
+TRIPLE_EXAMPLE = {
+    "time_speed": 12000,
+    "stars": [
+        {"mass": 1.989e30, "radius": 6.957e8, "color": "#FFD700"},
+        {"mass": 4.0e30, "radius": 2.2e9, "color": "#87CEFA"},
+        {"mass": 1.2e30, "radius": 8.0e8, "color": "#FF6F91"},
+    ],
+}
+
+
+def cluster(n: int, seed: int = 0) -> gravity.Stars:
+    """Reproducible flat cluster of n Sun-like stars on roughly circular orbits around the centre."""
+    rng = np.random.default_rng(seed)
+    mass = rng.uniform(0.1, 2.0, n) * gravity.MS
+    radius = gravity.RS * (mass / gravity.MS) ** 0.8
+    pos = rng.normal(0, gravity.AE * math.sqrt(n), (n, 2))
+    pos -= (mass[:, None] * pos).sum(axis=0) / mass.sum()
+
+    d = np.hypot(pos[:, 0], pos[:, 1])
+    order = np.argsort(d)
+    enclosed = np.empty(n)
+    enclosed[order] = np.cumsum(mass[order])
+    v = np.sqrt(gravity.G * enclosed / np.maximum(d, 1.0))
+    speed = np.stack((-pos[:, 1], pos[:, 0]), axis=1) / np.maximum(d, 1.0)[:, None] * v[:, None]
+
+    stars = [gravity.Star(x, y, r, m, "white") for (x, y), r, m in zip(pos, radius, mass)]
+    for s, (vx, vy) in zip(stars, speed):
+        s.speed = [vx, vy]
+    return gravity.Stars(stars)
+
+
+def binary_in_cluster(n: int, seed: int = 0) -> gravity.Stars:
+    """cluster(n) whose first two stars form a tight circular binary, which needs far finer steps than the rest."""
+    stars = cluster(n, seed)
+    m1, m2 = stars.mass[:2]
+    separation = 20 * (stars.r[0] + stars.r[1])
+    v = math.sqrt(gravity.G * (m1 + m2) / separation)
+    com, com_speed = stars.pos[0].copy(), stars.speed[0].copy()
+    stars.pos[0], stars.pos[1] = com - (m2 / (m1 + m2) * separation, 0), com + (m1 / (m1 + m2) * separation, 0)
+    stars.speed[0], stars.speed[1] = com_speed - (0, m2 / (m1 + m2) * v), com_speed + (0, m1 / (m1 + m2) * v)
+    return stars
+
+
+# name -> (time_speed, builder, default ticks)
+SCENARIOS = {
+    "two_body": (5000, lambda: gravity.two_body(), 2000),
+    "three_body": (5000, lambda: gravity.three_body(), 2000),
+    "binary_example": (BINARY_EXAMPLE["time_speed"], lambda: gravity.two_body(BINARY_EXAMPLE["stars"]), 2000),
+    "triple_example": (TRIPLE_EXAMPLE["time_speed"], lambda: gravity.three_body(TRIPLE_EXAMPLE["stars"]), 2000),
+    "cluster_10": (5000, lambda: cluster(10), 2000),
+    "cluster_100": (5000, lambda: cluster(100), 200),
+    "cluster_1000": (5000, lambda: cluster(1000), 20),
+    "cluster_10000": (5000, lambda: cluster(10_000), 2),
+    # ticks long enough that the binary needs sub-steps while the other stars do not
+    "binary_in_cluster": (5_000_000, lambda: binary_in_cluster(50), 200),
+}
+BLOCK_SCENARIOS = ("three_body", "binary_in_cluster")
+
+
+def _relative_drift(before: float, after: float) -> float:
+    return abs(after - before) / abs(before) if before else abs(after - before)
+
+
+def run_scenario(name: str, ticks: int | None = None) -> dict:
+    """Time one scenario with the current gravity settings."""
+    speed, build, default_ticks = SCENARIOS[name]
+    ticks = default_ticks if ticks is None else ticks
+    gravity.time_speed = speed
+
+    stars = build()
+    n_start = len(stars)
+    e0, l0 = gravity.energy(stars), gravity.angular_momentum(stars)
+    tm = time.perf_counter()
+    for _ in range(ticks):
+        stars = gravity.simulate_one_tick(stars)
+    wall = time.perf_counter() - tm
+
+    # memory is measured on a separate short run, tracemalloc slows everything down
+    tracemalloc.start()
+    probe = build()
+    for _ in range(min(ticks, 3)):
+        probe = gravity.simulate_one_tick(probe)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "scenario": name,
+        "stars_start": n_start,
+        "stars_end": len(stars),
+        "ticks": ticks,
+        "simulated_seconds": stars.time,
+        "wall_seconds": wall,
+        "ticks_per_second": ticks / wall if wall > 0 else math.inf,
+        "force_evaluations": stars.evaluations,
+        "force_evaluations_per_second": stars.evaluations / wall if wall > 0 else math.inf,
+        "peak_memory_mb": peak / 2 ** 20,
+        "energy_drift": _relative_drift(e0, gravity.energy(stars)),
+        "angular_momentum_drift": _relative_drift(l0, gravity.angular_momentum(stars)),
+    }
+
+
+def block_vs_hermite(names: list[str], ticks: int | None = None) -> list[dict]:
+    """Force evaluations of the block and the shared-step Hermite scheme on the same scenarios."""
+    integrator = gravity.integrator
+    rows = []
+    try:
+        for name in names:
+            runs = {}
+            for scheme in ("hermite", "block"):
+                gravity.integrator = scheme
+                runs[scheme] = run_scenario(name, ticks)
+            hermite, block = runs["hermite"]["force_evaluations"], runs["block"]["force_evaluations"]
+            rows.append({"scenario": name, "hermite_evaluations": hermite, "block_evaluations": block,
+                         "saving": 1 - block / hermite if hermite else 0.0,
+                         "hermite_energy_drift": runs["hermite"]["energy_drift"],
+                         "block_energy_drift": runs["block"]["energy_drift"]})
+    finally:
+        gravity.integrator = integrator
+    return rows
+
+
+def settings() -> dict:
+    return {name: getattr(gravity, name) for name in
+            ("solver", "theta", "integrator", "eta", "tolerance", "max_substeps", "kepler", "fps", "workers")}
+
+
+def compare(old: dict, new: dict) -> None:
+    """Print speed ratios and drifts of scenarios present in both result files."""
+    before = {r["scenario"]: r for r in old["results"]}
+    print(f"{'scenario':<16}{'speed-up':>10}{'energy drift':>26}{'L drift':>26}")
+    for r in new["results"]:
+        o = before.get(r["scenario"])
+        if o is None:
+            continue
+        ratio = r["ticks_per_second"] / o["ticks_per_second"] if o["ticks_per_second"] else math.inf
+        print(f"{r['scenario']:<16}{ratio:>9.2f}x"
+              f"{o['energy_drift']:>12.2e} -> {r['energy_drift']:<10.2e}"
+              f"{o['angular_momentum_drift']:>12.2e} -> {r['angular_momentum_drift']:<10.2e}")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the Stellar Dance physics.")
+    parser.add_argument("--only", nargs="+", choices=list(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--ticks", type=int, help="ticks per scenario instead of the defaults")
+    parser.add_argument("--solver", choices=gravity.SOLVERS)
+    parser.add_argument("--integrator", choices=list(gravity.INTEGRATORS))
+    parser.add_argument("--eta", type=float)
+    parser.add_argument("--workers", type=int, help="processes for direct summation")
+    parser.add_argument("--out", help="write the results JSON here")
+    parser.add_argument("--compare", help="earlier results JSON to compare against")
+    parser.add_argument("--block-vs-hermite", action="store_true",
+                        help="compare the force evaluations of the block and hermite integrators")
+    args = parser.parse_args(argv)
+
+    for name in ("solver", "integrator", "eta", "workers"):
+        if getattr(args, name) is not None:
+            setattr(gravity, name, getattr(args, name))
+
+    if args.block_vs_hermite:
+        rows = block_vs_hermite(args.only or list(BLOCK_SCENARIOS), args.ticks)
+        print(f"{'scenario':<20}{'hermite evals':>15}{'block evals':>15}{'saving':>9}")
+        for r in rows:
+            print(f"{r['scenario']:<20}{r['hermite_evaluations']:>15.0f}{r['block_evaluations']:>15.0f}"
+                  f"{r['saving']:>8.0%}")
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                json.dump({"settings": settings(), "block_vs_hermite": rows}, f, indent=2)
+        return
+
+    results = []
+    for name in args.only or SCENARIOS:
+        r = run_scenario(name, args.ticks)
+        results.append(r)
+        print(f"{name:<16}{r['ticks_per_second']:>10.1f} ticks/s{r['force_evaluations_per_second']:>10.1f} evals/s"
+              f"{r['peak_memory_mb']:>9.1f} MB  dE/E {r['energy_drift']:.2e}  dL/L {r['angular_momentum_drift']:.2e}")
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "settings": settings(),
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+from __future__ import annotations
+import numpy as np
+
+
+def candidate_pairs(pos: np.ndarray, r: np.ndarray, reach: float) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Pairs i < j closer than reach * (r_i + r_j), found by sweep and prune along x.
+
+    Each star covers the interval x +- reach * r; only stars whose intervals overlap are
+    compared, so the cost grows with the number of close pairs rather than with n ** 2.
+    Returns (i, j, d) sorted like a nested (i, j) loop.
+    """
+    n = len(r)
+    empty = np.zeros(0, dtype=np.int64)
+    if n < 2:
+        return empty, empty, np.zeros(0)
+    lo = pos[:, 0] - reach * r
+    hi = pos[:, 0] + reach * r
+    order = np.argsort(lo, kind="stable")
+    lo_sorted = lo[order]
+    # the intervals after k in sweep order that start before interval k ends overlap it
+    last = np.searchsorted(lo_sorted, hi[order], side="right")
+    counts = np.maximum(last - np.arange(1, n + 1), 0)
+    total = int(counts.sum())
+    if not total:
+        return empty, empty, np.zeros(0)
+    a = np.repeat(np.arange(n), counts)
+    b = a + 1 + np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    i, j = order[a], order[b]
+
+    dif = pos[j] - pos[i]
+    keep = np.abs(dif[:, 1]) < reach * (r[i] + r[j])
+    i, j, dif = i[keep], j[keep], dif[keep]
+    d = np.hypot(dif[:, 0], dif[:, 1])
+    keep = reach * (r[i] + r[j]) > d
+    i, j, d = i[keep], j[keep], d[keep]
+
+    i, j = np.minimum(i, j), np.maximum(i, j)
+    srt = np.lexsort((j, i))
+    return i[srt], j[srt], d[srt]
@@ -0,0 +1,168 @@
+"""Control channel between app.py and a long-lived simulator window.
+
+gravity.py --serve PORT keeps one window open and reads JSON-lines commands on
+127.0.0.1:PORT, answering each with one JSON line:
+
+    {"cmd": "load", "config": {...}}        new stars and settings (user_stars.json format)
+    {"cmd": "set", "time_speed": 20000}     change module settings (see gravity.CHECKPOINT_SETTINGS)
+    {"cmd": "pause"} / {"cmd": "resume"}
+    {"cmd": "reset"}                         restart the last loaded config
+    {"cmd": "status"}                        tick, simulated time, star count, paused
+    {"cmd": "shutdown"}
+
+Every command must carry "token": the secret of the process that started the simulator,
+handed to it in STELLAR_DANCE_CONTROL_TOKEN; commands without it are refused, so other
+local programs (or web pages posting to the port) cannot drive the window. A loaded
+config never names files to write (FILE_KEYS are dropped, see remote_config).
+
+Every reply carries "app": "stellar-dance", so a client can tell the simulator from some
+other service on the port. The app side only needs send() and ensure_server(); its port is
+taken from STELLAR_DANCE_CONTROL_PORT, which start.py sets per app instance (together with
+the token, so a restarted app still reaches its window).
+"""
+from __future__ import annotations
+import hmac
+import json
+import os
+import secrets
+import socket
+import subprocess
+import time
+
+PORT_ENV = "STELLAR_DANCE_CONTROL_PORT"
+TOKEN_ENV = "STELLAR_DANCE_CONTROL_TOKEN"
+DEFAULT_PORT = int(os.environ.get(PORT_ENV) or 8765)
+TOKEN = os.environ.get(TOKEN_ENV) or secrets.token_hex(16)  # inherited by the simulators ensure_server starts
+HOST = "127.0.0.1"
+APP = "stellar-dance"
+FILE_KEYS = ("profile", "record", "checkpoint")  # config keys naming files the simulator writes
+
+
+class NotSimulatorError(ConnectionError):
+    """Something answers on the port, but not a Stellar Dance simulator."""
+
+
+def remote_config(config: dict | None) -> dict | None:
+    """A config received over the channel, without the keys that would make the simulator write files."""
+    if not isinstance(config, dict):
+        return config
+    return {key: value for key, value in config.items() if key not in FILE_KEYS}
+
+
+class ControlServer:
+    """Non-blocking listener polled once per frame by the simulator loop."""
+
+    def __init__(self, port: int = DEFAULT_PORT, token: str = TOKEN) -> None:
+        self._token = token.encode("utf-8")
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.bind((HOST, port))  # fails if another simulator already serves this port
+        self._listener.listen()
+        self._listener.setblocking(False)
+        self._clients = {}  # socket -> bytes received so far
+
+    def poll(self) -> list[tuple[socket.socket, dict]]:
+        """Commands received since the last call, with the connection to reply on."""
+        try:
+            while True:
+                conn, _ = self._listener.accept()
+                conn.setblocking(False)
+                self._clients[conn] = b""
+        except BlockingIOError:
+            pass
+
+        commands = []
+        for conn in list(self._clients):
+            try:
+                chunk = conn.recv(65536)
+            except BlockingIOError:
+                continue
+            except OSError:
+                chunk = b""
+            if not chunk:
+                self._drop(conn)
+                continue
+            lines = (self._clients[conn] + chunk).split(b"\n")
+            self._clients[conn] = lines.pop()
+            for line in lines:
+                try:
+                    command = json.loads(line)
+                except ValueError:
+                    self.reply(conn, {"ok": False, "error": "not JSON"})
+                    continue
+                token = command.pop("token", None) if isinstance(command, dict) else None
+                if not isinstance(token, str) or not hmac.compare_digest(token.encode("utf-8"), self._token):
+                    self.reply(conn, {"ok": False, "error": "unauthorized"})
+                    continue
+                commands.append((conn, command))
+        return commands
+
+    def reply(self, conn: socket.socket, message: dict) -> None:
+        try:
+            conn.setblocking(True)
+            conn.sendall(json.dumps({**message, "app": APP}).encode("utf-8") + b"\n")
+            conn.setblocking(False)
+        except OSError:
+            self._drop(conn)
+
+    def _drop(self, conn: socket.socket) -> None:
+        self._clients.pop(conn, None)
+        conn.close()
+
+    def close(self) -> None:
+        for conn in list(self._clients):
+            self._drop(conn)
+        self._listener.close()
+
+
+def send(command: dict, port: int = DEFAULT_PORT, timeout: float = 2.0, token: str = TOKEN) -> dict:
+    """Send one command to the simulator and return its reply.
+
+    Raises OSError when none is running, NotSimulatorError when another program holds the port
+    and PermissionError when the simulator was started with another token.
+    """
+    with socket.create_connection((HOST, port), timeout=timeout) as conn:
+        conn.sendall(json.dumps({**command, "token": token}).encode("utf-8") + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = conn.recv(65536)
+            if not chunk:
+                raise ConnectionError("simulator closed the connection")
+            reply += chunk
+    try:
+        message = json.loads(reply)
+    except ValueError:
+        message = None
+    if not isinstance(message, dict) or message.get("app") != APP:
+        raise NotSimulatorError(f"port {port} is not served by a Stellar Dance simulator")
+    if message.get("error") == "unauthorized":
+        raise PermissionError(f"the simulator on port {port} was started by another app")
+    return message
+
+
+def ensure_server(command: list[str], cwd: str | None = None, port: int = DEFAULT_PORT,
+                  timeout: float = 15.0) -> bool:
+    """Start the simulator with command unless one already answers on port.
+
+    Returns True when a new process was started. Waits until it answers, so the next
+    send() reaches it. The process gets TOKEN in its environment.
+    """
+    try:
+        send({"cmd": "status"}, port)
+        return False
+    except (NotSimulatorError, PermissionError):
+        raise  # a new simulator could not bind the port either
+    except OSError:
+        pass
+    process = subprocess.Popen(command, cwd=cwd, env={**os.environ, TOKEN_ENV: TOKEN})
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"simulator exited with code {process.returncode}")
+        try:
+            send({"cmd": "status"}, port, timeout=0.5)
+            return True
+        except (NotSimulatorError, PermissionError):
+            raise
+        except OSError:
+            time.sleep(0.1)
+    raise TimeoutError(f"simulator did not answer on port {port} within {timeout:.0f} s")
@@ -1,18 +1,58 @@
 from __future__ import annotations
-import time
 import math
-import pygame
-import sys, json
+import sys
+import numpy as np
+import json
+import argparse
 
-fps = 120
+from startup import lazy_import
+
+try:
+    pygame = lazy_import("pygame")  # loaded on first use, so importing the physics (app.py, sweeps) skips it
+except ImportError:  # headless runs only need the physics
+    pygame = None
+
+import barnes_hut
+import contacts
+import control
+import recording
+import tiles
+from profiler import Profiler
+
+fps = 120  # physics ticks per real second
+frame_rate = 60  # redraws per real second (upper bound)
 k = 1000000  # meters in one pixel
 mouse_x, mouse_y = 0, 0
-time_speed = 5000  # default time acceleration
+time_speed = 5000  # simulated seconds per real second
+solver = "exact"  # "exact" or "barnes_hut"
+theta = 0.5  # Barnes-Hut opening angle
+integrator = "leapfrog"  # "euler", "leapfrog", "hermite", "block" or "rk45"
+eta = 0.02  # sub-step size as a fraction of the shortest free-fall time; 0 = one step per frame
+tolerance = 1e-8  # rk45 error per step, relative to neighbour distance
+max_substeps = 2000  # per frame, so close encounters cannot freeze the window
+kepler = True  # move isolated bound binaries along their analytic orbit
+trail_length = 1000  # trail points kept per star
+workers = 1  # processes for direct summation of large systems
+recorder = None  # recording.Recorder of the run; set by the "record" config key
 
 G = 6.67 / 10 ** 11
 MS = 1.989 * 10 ** 30
 RS = 696_340_000
 AE = 149_597_870_700
+# a Roche exchange needs r1 + r2 > d * f(q) with f(q) >= 0.49 / (0.6 + ln 2) (q -> 1),
+# so pairs further apart than ROCHE_REACH * (r1 + r2) can never touch or exchange mass
+ROCHE_REACH = (0.6 + math.log(2)) / 0.49 * 1.001
+PARALLEL_MIN_STARS = 2000  # below this the workers cost more than they save
+EXCHANGE_FRACTION = 1e-6  # of the donor mass, per time_speed / fps simulated seconds
+
+profiler = Profiler()  # per-phase timings; enabled by the "profile" config key or the P key
+
+# settings a simulation can have of its own (Settings); stars without them use the module settings
+SIMULATION_SETTINGS = ("time_speed", "solver", "theta", "integrator", "eta", "tolerance", "max_substeps", "kepler",
+                       "trail_length")
+SOLVERS = ("exact", "barnes_hut")
+# the settings before any config; a config that leaves a key out gets these, not what the last one set
+DEFAULTS = {name: globals()[name] for name in SIMULATION_SETTINGS + ("frame_rate", "workers")}
 
 
 class Star:
@@ -22,120 +62,856 @@ class Star:
         self.r = r
         self.mass = m
         self.color = color
-        self.speed = [0, 0]
-        self.force = [0, 0]
-        self.status = True
+        self.speed = [0, 0]  # m/s
         self.trace_count = 0
         self.trace = []
 
-    def update_coordinates(self) -> None:
-        self.speed[0] += (self.force[0] / self.mass) * time_speed ** 2 / fps ** 2
-        self.speed[1] += (self.force[1] / self.mass) * time_speed ** 2 / fps ** 2
-
-        self.x += self.speed[0]
-        self.y += self.speed[1]
-
-        self.trace_count += (self.speed[0] ** 2 + self.speed[1] ** 2) ** 0.5
-        if self.trace_count / k >= 7:
-            self.trace_count = 0
-            self.trace.append((self.x, self.y))
-        if len(self.trace) > 1000:
-            self.trace.pop(0)
-
-    def roche_radius(self, other: Star) -> float:
-        q = other.mass / self.mass
-        numerator = 0.49 * q ** (-2 / 3)
-        denumerator = 0.6 * q ** (-2 / 3) + math.log(1 + q ** (-1 / 3))
-        r = math.sqrt((self.x - other.x) ** 2 + (self.y - other.y) ** 2)
-        return r * numerator / denumerator
-
-    def draw_mass_exchange(self, other: Star) -> None:
-        pygame.draw.line(
+
+class Stars:
+    """All bodies of the simulation stored as contiguous arrays (one row per star)."""
+
+    # per-star arrays, kept aligned by append() and compress()
+    arrays = ("pos", "speed", "force", "jerk", "r", "mass", "mass_cbrt", "status", "trace_count", "nearest",
+              "trace", "trace_head", "trace_len")
+
+    def __init__(self, stars: list[Star] = (), settings: Settings | None = None) -> None:
+        stars = list(stars)
+        self.settings = settings  # None: the module settings
+        trail_length = _settings(self).trail_length
+        self.pos = np.array([(s.x, s.y) for s in stars], dtype=float).reshape(-1, 2)
+        self.speed = np.array([s.speed for s in stars], dtype=float).reshape(-1, 2)
+        self.force = np.zeros_like(self.pos)
+        self.jerk = np.zeros_like(self.pos)  # d(acceleration)/dt, only kept up to date for hermite
+        self.r = np.array([s.r for s in stars], dtype=float)
+        self.mass = np.array([s.mass for s in stars], dtype=float)
+        self.mass_cbrt = np.cbrt(self.mass)  # for the Roche test; refreshed wherever a mass changes
+        self.color = [s.color for s in stars]
+        self.status = np.ones(len(stars), dtype=bool)
+        self.trace_count = np.array([s.trace_count for s in stars], dtype=float)
+        # trails are ring buffers: trace_head is the next slot to write, trace_len the filled slots
+        self.trace = np.zeros((len(stars), trail_length, 2))
+        self.trace_len = np.array([min(len(s.trace), trail_length) for s in stars], dtype=np.int64)
+        self.trace_head = self.trace_len % max(trail_length, 1)
+        self.trail_changes = []  # trail points added or dropped since the last draw, None = too many to track
+        for i, s in enumerate(stars):
+            if self.trace_len[i]:
+                self.trace[i, :self.trace_len[i]] = s.trace[-self.trace_len[i]:]
+        self.nearest = np.full(len(stars), np.inf)  # distance to the closest neighbour seen by the solver
+        self.contacts = None  # (collides, exchanges) matching force, None when they must be recomputed
+        self.step = None  # rk45 step size carried over between frames
+        self.orbit = None  # cached KeplerOrbit while the stars are an isolated binary
+        self.time = 0.0  # simulated seconds since the start
+        self.evaluations = 0.0  # force evaluations so far, in units of one full n-body evaluation
+        self.exchanges = []  # (gainer, donor) pairs of the last tick, for drawing
+        self.merges = []  # stars created by collisions during the last tick
+
+    def __len__(self) -> int:
+        return len(self.mass)
+
+    def append(self, stars: list[Star]) -> None:
+        if not stars:
+            return
+        new = Stars(stars, self.settings)
+        self.orbit = None
+        self.trail_changes = None
+        for name in self.arrays:
+            setattr(self, name, np.concatenate((getattr(self, name), getattr(new, name))))
+        self.color += new.color
+
+    def compress(self) -> None:
+        """Drop every star whose status is False."""
+        keep = self.status
+        if keep.all():
+            return
+        self.orbit = None
+        self.trail_changes = None
+        idx = np.flatnonzero(keep)
+        new_index = np.cumsum(keep) - 1
+        self.exchanges = [(int(new_index[i]), int(new_index[j])) for i, j in self.exchanges]
+        self.merges = [int(new_index[i]) for i in self.merges if keep[i]]
+        for name in self.arrays:
+            setattr(self, name, getattr(self, name)[keep])
+        self.color = [self.color[i] for i in idx]
+
+    def acceleration(self) -> np.ndarray:
+        return self.force / self.mass[:, None]
+
+    @profiler.timed("trails")
+    def update_trace(self, h: float) -> None:
+        self.trace_count += np.hypot(self.speed[:, 0], self.speed[:, 1]) * h
+        moved = np.flatnonzero(self.trace_count / k >= 7)
+        if not len(moved) or not self.trace.shape[1]:
+            return
+        self.trace_count[moved] = 0
+        if self.trail_changes is not None:
+            if len(self.trail_changes) < 64:
+                full = moved[self.trace_len[moved] == self.trace.shape[1]]
+                self.trail_changes += [self.pos[moved].copy(), self.trace[full, self.trace_head[full]].copy()]
+            else:
+                self.trail_changes = None
+        self.trace[moved, self.trace_head[moved]] = self.pos[moved]
+        self.trace_head[moved] = (self.trace_head[moved] + 1) % self.trace.shape[1]
+        self.trace_len[moved] = np.minimum(self.trace_len[moved] + 1, self.trace.shape[1])
+
+    def trail(self, i: int) -> np.ndarray:
+        """Trail points of star i, oldest first."""
+        if self.trace_len[i] < self.trace.shape[1]:
+            return self.trace[i, :self.trace_len[i]]
+        return np.roll(self.trace[i], -self.trace_head[i], axis=0)
+
+    def draw_mass_exchange(self, i: int, j: int) -> pygame.Rect:
+        return pygame.draw.line(
             screen,
-            other.color,
-            ((other.x - mouse_x) / k - other.r / k, (other.y - mouse_y) / k),
-            ((self.x - mouse_x) / k + self.r / k, (self.y - mouse_y) / k),
+            self.color[j],
+            ((self.pos[j, 0] - mouse_x) / k - self.r[j] / k, (self.pos[j, 1] - mouse_y) / k),
+            ((self.pos[i, 0] - mouse_x) / k + self.r[i] / k, (self.pos[i, 1] - mouse_y) / k),
             2,
         )
 
-    def draw(self) -> None:
-        pygame.draw.circle(screen, self.color, ((self.x - mouse_x) / k, (self.y - mouse_y) / k), self.r / k)
-        for i in self.trace:
-            pygame.draw.circle(screen, self.color, ((i[0] - mouse_x) / k, (i[1] - mouse_y) / k), 1)
+    def draw_trails(self) -> None:
+        """Write every trail point of every star straight into the screen pixels (2x2 dots)."""
+        if not len(self) or not self.trace.shape[1]:
+            return
+        filled = np.arange(self.trace.shape[1])[None, :] < self.trace_len[:, None]
+        star, slot = np.nonzero(filled)
+        xs = ((self.trace[star, slot, 0] - mouse_x) / k).astype(np.int64)
+        ys = ((self.trace[star, slot, 1] - mouse_y) / k).astype(np.int64)
+        width, height = screen.get_size()
+        visible = (xs >= 0) & (xs < width - 1) & (ys >= 0) & (ys < height - 1)
+        xs, ys = xs[visible], ys[visible]
+        colors = np.array([_mapped_color(c) for c in self.color], dtype=np.uint32)[star[visible]]
+        pixels = pygame.surfarray.pixels2d(screen)
+        for dx, dy in ((0, 0), (1, 0), (0, 1), (1, 1)):
+            pixels[xs + dx, ys + dy] = colors
+        del pixels  # unlocks the surface
 
+    def draw(self) -> list[pygame.Rect] | None:
+        """Draw the stars, trails and mass-exchange lines.
 
-def update_forces(stars: list[Star], collides: list[tuple[int]], exchanges: list[tuple[int]]) -> None:
-    for i in range(len(stars)):
-        for j in range(i + 1, len(stars)):
-            dif_x = stars[j].x - stars[i].x
-            dif_y = stars[j].y - stars[i].y
-            d = (dif_x ** 2 + dif_y ** 2) ** 0.5
-            f = G * stars[i].mass * stars[j].mass / d ** 2
+        Returns the screen areas that changed besides the previous frame's, or None when
+        the whole screen has to be updated.
+        """
+        rects = [self.draw_mass_exchange(i, j) for i, j in self.exchanges]
+        self.draw_trails()
+        width, height = screen.get_size()
+        cx = (self.pos[:, 0] - mouse_x) / k
+        cy = (self.pos[:, 1] - mouse_y) / k
+        radius = (self.r / k).astype(np.int64)
+        on_screen = (cx + radius >= 0) & (cx - radius < width) & (cy + radius >= 0) & (cy - radius < height)
+        for i in np.flatnonzero(on_screen & (radius > 0)):
+            if radius[i] <= SPRITE_MAX_RADIUS:
+                sprite = _sprite(self.color[i], int(radius[i]))
+                rects.append(screen.blit(sprite, (cx[i] - radius[i], cy[i] - radius[i])))
+            else:
+                rects.append(pygame.draw.circle(screen, self.color[i], (cx[i], cy[i]), radius[i]))
 
-            stars[i].force[0] += dif_x * f / d
-            stars[i].force[1] += dif_y * f / d
-            stars[j].force[0] -= dif_x * f / d
-            stars[j].force[1] -= dif_y * f / d
+        if self.trail_changes is None:
+            self.trail_changes = []
+            return None
+        if self.trail_changes:
+            points = np.concatenate(self.trail_changes)
+            self.trail_changes = []
+            rects += [pygame.Rect(int((x - mouse_x) / k), int((y - mouse_y) / k), 2, 2) for x, y in points]
+        return rects
 
-            if stars[i].r + stars[j].r > d:
-                collides.append((i, j))
-                continue
 
-            if stars[i].mass > stars[j].mass and stars[i].r + stars[j].r > stars[i].roche_radius(stars[j]):
-                exchanges.append((i, j))
-                continue
+SPRITE_MAX_RADIUS = 64  # larger stars are drawn directly; pygame clips them to the screen
+_sprites = {}
 
 
-def remove_collides(stars: list[Star], collides: list[tuple[int, int]]) -> None:
-    for i in collides:
-        p1 = stars[i[0]]
-        p2 = stars[i[1]]
-        if p1.status and p2.status:
-            if p1.mass > p2.mass:
-                new_star = Star(p1.x, p1.y, p1.r + p2.r, p1.mass + p2.mass, p1.color)
-            else:
-                new_star = Star(p2.x, p2.y, p1.r + p2.r, p1.mass + p2.mass, p2.color)
+class Settings:
+    """Physics settings of one simulation, so that several can run side by side in one process.
+
+    Takes the SIMULATION_SETTINGS keys of a user_stars.json-style config, DEFAULTS for
+    the keys it leaves out.
+    """
+
+    def __init__(self, config: dict | None = None) -> None:
+        config = config or {}
+        for name in SIMULATION_SETTINGS:
+            setattr(self, name, config.get(name, DEFAULTS[name]))
+        self.theta = float(self.theta)
+        self.eta = float(self.eta)
+        self.tolerance = float(self.tolerance)
+        self.max_substeps = int(self.max_substeps)
+        self.kepler = bool(self.kepler)
+        self.trail_length = int(self.trail_length)
+        _check_names(self.solver, self.integrator)
+
+
+def _check_names(solver: str, integrator: str) -> None:
+    """ValueError for a solver or integrator name that is not known (e.g. a typo in a config)."""
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver {solver!r}, expected one of {', '.join(SOLVERS)}.")
+    if integrator not in INTEGRATORS:
+        raise ValueError(f"Unknown integrator {integrator!r}, expected one of {', '.join(INTEGRATORS)}.")
+
+
+def _settings(stars: Stars) -> Settings:
+    """Settings of stars; this module itself (its settings) for stars without their own."""
+    return stars.settings if stars.settings is not None else sys.modules[__name__]
+
+
+def _sprite(color: str, radius: int) -> pygame.Surface:
+    """Pre-rendered disc of the given color and pixel radius, reused across frames."""
+    key = (color, radius)
+    if key not in _sprites:
+        if len(_sprites) > 512:  # zooming creates new radii; forget the old ones
+            _sprites.clear()
+        surface = pygame.Surface((2 * radius + 1, 2 * radius + 1))
+        surface.set_colorkey((1, 2, 3))
+        surface.fill((1, 2, 3))
+        pygame.draw.circle(surface, color, (radius, radius), radius)
+        _sprites[key] = surface.convert() if pygame.display.get_surface() else surface
+    return _sprites[key]
+
+
+_color_values = {}
+
+
+def _mapped_color(color: str) -> int:
+    """Pixel value of a color name or hex string on the screen surface."""
+    if color not in _color_values:
+        _color_values[color] = screen.map_rgb(pygame.Color(color))
+    return _color_values[color]
+
+
+def roche_radius(m1: np.ndarray, m2: np.ndarray, d: np.ndarray) -> np.ndarray:
+    """Roche lobe radius of bodies with mass m1 and companions of mass m2 at distance d (Eggleton)."""
+    q = m2 / m1
+    numerator = 0.49 * q ** (-2 / 3)
+    denumerator = 0.6 * q ** (-2 / 3) + np.log(1 + q ** (-1 / 3))
+    return d * numerator / denumerator
+
+
+def roche_factor(cbrt1: np.ndarray, cbrt2: np.ndarray) -> np.ndarray:
+    """roche_radius(m1, m2, 1) from the cube roots of the masses (Stars.mass_cbrt), without fractional powers."""
+    x = cbrt1 / cbrt2  # q ** (-1 / 3)
+    return 0.49 * x ** 2 / (0.6 * x ** 2 + np.log1p(x))
+
+
+@profiler.timed("forces")
+def accelerations(stars: Stars, pos: np.ndarray, vel: np.ndarray | None = None,
+                  collides: list[tuple[int]] | None = None,
+                  exchanges: list[tuple[int]] | None = None,
+                  rows: np.ndarray | None = None) -> tuple[np.ndarray, np.ndarray | None]:
+    """Gravitational accelerations of the stars placed at pos, and their jerks when vel is given.
+
+    Only the stars listed in rows are evaluated (all by default), against every star.
+    Also refreshes stars.nearest for those rows, and appends contact candidates to
+    collides/exchanges when those lists are passed. Jerks always use direct summation.
+    """
+    n = len(stars)
+    rows = np.arange(n) if rows is None else rows
+    stars.evaluations += len(rows) / max(n, 1)
+    acc = np.zeros((len(rows), 2))
+    jerk = None if vel is None else np.zeros((len(rows), 2))
+    nearest = np.full(len(rows), np.inf)
+    if n < 2:
+        stars.nearest[rows] = nearest
+        return acc, jerk
+    settings = _settings(stars)
+    if settings.solver == "barnes_hut" and vel is None and len(rows) == n:
+        acc, i, j, d = barnes_hut.tree_forces(pos, stars.mass, stars.r, G, settings.theta, ROCHE_REACH)
+        np.minimum.at(nearest, i, d)
+        np.minimum.at(nearest, j, d)
+        stars.nearest = nearest
+        if collides is not None:
+            _check_contacts(stars, i, j, d, collides, exchanges)
+        return acc, jerk
+
+    pool = _tile_pool(n)
+    if pool is not None:
+        acc, jerk, nearest = pool.forces(pos, vel, stars.mass, rows, G)
+    else:
+        # rows are processed in blocks so the pairwise matrices stay small for large n
+        block = max(1, tiles.BLOCK_ELEMENTS // n)
+        for a in range(0, len(rows), block):
+            tile_acc, tile_jerk, nearest[a:a + block] = tiles.pair_forces(pos, vel, stars.mass, rows[a:a + block], G)
+            acc[a:a + block] = tile_acc
+            if vel is not None:
+                jerk[a:a + block] = tile_jerk
+    if collides is not None:
+        i, j, d = contacts.candidate_pairs(pos, stars.r, ROCHE_REACH)
+        _check_contacts(stars, i, j, d, collides, exchanges)
+    stars.nearest[rows] = nearest
+    return acc, jerk
+
+
+_pool = None
+
+
+def _tile_pool(n: int) -> tiles.TilePool | None:
+    """The shared worker pool for direct summation, when it is enabled and pays off for n stars."""
+    global _pool
+    if workers <= 1 or n < PARALLEL_MIN_STARS:
+        return None
+    if _pool is None or _pool.workers != workers:
+        if _pool is not None:
+            _pool.close()
+        _pool = tiles.TilePool(workers)
+    return _pool
+
+
+def energy(stars: Stars) -> float:
+    """Total kinetic plus potential energy (J)."""
+    kinetic = 0.5 * float((stars.mass * (stars.speed ** 2).sum(axis=1)).sum())
+    potential = 0.0
+    n = len(stars)
+    block = max(1, 4_000_000 // max(n, 1))
+    for a in range(0, n, block):
+        dif = stars.pos[None, a + 1:, :] - stars.pos[a:a + block, None, :]
+        d = np.hypot(dif[..., 0], dif[..., 1])
+        # keep only pairs i < j: row a + r pairs with column a + 1 + c when c >= r
+        upper = np.arange(d.shape[1])[None, :] >= np.arange(d.shape[0])[:, None]
+        with np.errstate(divide="ignore"):
+            potential -= G * float((stars.mass[a:a + block, None] * stars.mass[None, a + 1:] / d)[upper].sum())
+    return kinetic + potential
+
+
+def angular_momentum(stars: Stars) -> float:
+    """Total angular momentum about the origin (kg m^2 / s, z component)."""
+    return float((stars.mass * (stars.pos[:, 0] * stars.speed[:, 1] - stars.pos[:, 1] * stars.speed[:, 0])).sum())
 
-            new_star.speed = [
-                (p1.mass * p1.speed[0] + p2.mass * p2.speed[0]) / (p1.mass + p2.mass),
-                (p1.mass * p1.speed[1] + p2.mass * p2.speed[1]) / (p1.mass + p2.mass),
-            ]
 
-            stars.append(new_star)
-            p1.status = p2.status = False
+def update_forces(stars: Stars, collides: list[tuple[int]], exchanges: list[tuple[int]]) -> None:
+    """Forces at the current positions (and jerks for the Hermite schemes) plus contact candidates."""
+    hermite = _settings(stars).integrator in ("hermite", "block")
+    acc, jerk = accelerations(stars, stars.pos, stars.speed if hermite else None, collides, exchanges)
+    stars.force += stars.mass[:, None] * acc
+    if jerk is not None:
+        stars.jerk = jerk
+    stars.contacts = (collides, exchanges)
 
 
-def exchange_masses(stars: list[Star], exchanges: list[tuple[int]]) -> None:
+def _check_contacts(stars: Stars, i: np.ndarray, j: np.ndarray, d: np.ndarray,
+                    collides: list[tuple[int]], exchanges: list[tuple[int]]) -> None:
+    """Narrow collision and Roche overflow tests for candidate pairs i < j at distance d."""
+    r_sum = stars.r[i] + stars.r[j]
+    collide = r_sum > d
+    exchange = ~collide & (stars.mass[i] > stars.mass[j])
+    if exchange.any():
+        exchange[exchange] = r_sum[exchange] > d[exchange] * roche_factor(stars.mass_cbrt[i[exchange]],
+                                                                          stars.mass_cbrt[j[exchange]])
+
+    for p in np.flatnonzero(collide | exchange):
+        if collide[p]:
+            collides.append((int(i[p]), int(j[p])))
+        else:
+            exchanges.append((int(i[p]), int(j[p])))
+
+
+@profiler.timed("collisions")
+def remove_collides(stars: Stars, collides: list[tuple[int, int]]) -> None:
+    merged = []
+    for i in collides:
+        i1, i2 = i
+        if stars.status[i1] and stars.status[i2]:
+            m1, m2 = stars.mass[i1], stars.mass[i2]
+            p = i1 if m1 > m2 else i2
+            new_star = Star(stars.pos[p, 0], stars.pos[p, 1], stars.r[i1] + stars.r[i2], m1 + m2, stars.color[p])
+            new_star.speed = list((m1 * stars.speed[i1] + m2 * stars.speed[i2]) / (m1 + m2))
+
+            merged.append(new_star)
+            stars.status[i1] = stars.status[i2] = False
+    stars.merges += range(len(stars), len(stars) + len(merged))
+    stars.append(merged)
+
+
+@profiler.timed("exchange")
+def exchange_masses(stars: Stars, exchanges: list[tuple[int]], fraction: float = EXCHANGE_FRACTION) -> None:
     for i in exchanges:
-        s1 = stars[i[0]]
-        s2 = stars[i[1]]
-        if s1.status and s2.status:
-            amount = s2.mass * 1e-6
-            s2.r -= amount * (s2.r / s2.mass)
-            s2.mass -= amount
-            s1.r += amount * (s1.r / s1.mass)
-            s1.mass += amount
-            s1.draw_mass_exchange(s2)
-
-
-def simulate_one_tick(stars: list[Star]) -> list[Star]:
-    collides = []
-    exchanges = []
-    update_forces(stars, collides, exchanges)
-    remove_collides(stars, collides)
-    exchange_masses(stars, exchanges)
-
-    new_stars = []
-    for star in stars:
-        if star.status:
-            star.update_coordinates()
-            star.force = [0, 0]
-            new_stars.append(star)
-            star.draw()
-    return new_stars
-
-
-def two_body(custom_stars=None) -> list[Star]:
+        i1, i2 = i
+        if stars.status[i1] and stars.status[i2]:
+            amount = stars.mass[i2] * fraction
+            stars.r[i2] -= amount * (stars.r[i2] / stars.mass[i2])
+            stars.mass[i2] -= amount
+            stars.r[i1] += amount * (stars.r[i1] / stars.mass[i1])
+            stars.mass[i1] += amount
+            stars.mass_cbrt[[i1, i2]] = np.cbrt(stars.mass[[i1, i2]])
+            stars.exchanges.append((i1, i2))
+
+
+# Integrators advance the stars by h seconds, starting from stars.force (and stars.jerk)
+# at the current positions. Their last force evaluation is made with update_forces at the
+# new positions, so it doubles as the first evaluation of the next step. They return the
+# time actually advanced, which rk45 may shrink below h.
+
+def euler_step(stars: Stars, h: float) -> float:
+    """Semi-implicit (symplectic) Euler, first order."""
+    stars.speed += stars.acceleration() * h
+    stars.pos += stars.speed * h
+    _refresh(stars)
+    return h
+
+
+def leapfrog_step(stars: Stars, h: float) -> float:
+    """Kick-drift-kick leapfrog (velocity Verlet), second order and symplectic."""
+    stars.speed += stars.acceleration() * (h / 2)
+    stars.pos += stars.speed * h
+    _refresh(stars)
+    stars.speed += stars.acceleration() * (h / 2)
+    return h
+
+
+def hermite_step(stars: Stars, h: float) -> float:
+    """Fourth-order Hermite predictor-corrector using accelerations and jerks."""
+    a0, j0 = stars.acceleration(), stars.jerk
+    x0, v0 = stars.pos.copy(), stars.speed.copy()
+    stars.pos += v0 * h + a0 * (h ** 2 / 2) + j0 * (h ** 3 / 6)
+    stars.speed += a0 * h + j0 * (h ** 2 / 2)
+    _refresh(stars)
+    a1, j1 = stars.acceleration(), stars.jerk
+    stars.speed = v0 + (a0 + a1) * (h / 2) + (j0 - j1) * (h ** 2 / 12)
+    stars.pos = x0 + (v0 + stars.speed) * (h / 2) + (a0 - a1) * (h ** 2 / 12)
+    return h
+
+
+def block_step(stars: Stars, h: float) -> float:
+    """Hermite with individual power-of-two time steps (block time steps).
+
+    Each star moves with the largest step h / 2 ** k below eta times its own free-fall
+    time. At every block boundary only the stars that are due get new forces, taken
+    from the predicted positions of all the others; everyone meets again at h.
+
+    No star steps longer than a frame, so only the evaluations of coarse stars during
+    the fine sub-steps of others are saved: little for a triple (about 2-10% on the
+    default one, at most a third), much more for many stars around a few tight pairs
+    (benchmark.py --block-vs-hermite).
+    """
+    settings = _settings(stars)
+    levels = max(0, math.ceil(math.log2(settings.max_substeps)))
+    end = 1 << levels  # h in integer block ticks
+    unit = h / end
+    x, v = stars.pos.copy(), stars.speed.copy()
+    a, j = stars.acceleration(), stars.jerk.copy()
+    tick = np.zeros(len(stars), dtype=np.int64)
+    size = end >> _block_levels(a, stars.nearest, tick, h, levels, settings.eta)
+    while True:
+        t_next = (tick + size).min()
+        due = np.flatnonzero(tick + size == t_next)
+        dt = ((t_next - tick) * unit)[:, None]
+        xp = x + v * dt + a * (dt ** 2 / 2) + j * (dt ** 3 / 6)
+        vp = v + a * dt + j * (dt ** 2 / 2)
+        if t_next == end:
+            # everybody is due: one full evaluation, which also finds the contacts
+            stars.pos, stars.speed = xp, vp
+            _refresh(stars)
+            a1, j1 = stars.acceleration(), stars.jerk
+        else:
+            a1, j1 = accelerations(stars, xp, vp, rows=due)
+
+        hd = dt[due]
+        v_new = v[due] + (a[due] + a1) * (hd / 2) + (j[due] - j1) * (hd ** 2 / 12)
+        x[due] = x[due] + (v[due] + v_new) * (hd / 2) + (a[due] - a1) * (hd ** 2 / 12)
+        v[due], a[due], j[due] = v_new, a1, j1
+        tick[due] = t_next
+        if t_next == end:
+            stars.pos, stars.speed = x, v
+            return h
+        size[due] = end >> _block_levels(a1, stars.nearest[due], tick[due], h, levels, settings.eta)
+
+
+def _block_levels(acc: np.ndarray, nearest: np.ndarray, tick: np.ndarray, h: float, levels: int,
+                  eta: float) -> np.ndarray:
+    """Block level k (step h / 2 ** k) for stars now at the given block ticks."""
+    if eta <= 0:
+        return np.zeros(len(tick), dtype=np.int64)
+    a = np.hypot(acc[:, 0], acc[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = h / (eta * np.sqrt(nearest / a))
+        k = np.ceil(np.log2(np.where(ratio > 0, ratio, 1)))
+    k = np.clip(np.nan_to_num(k, nan=0), 0, levels).astype(np.int64)
+    # a step may only grow when the star sits on a boundary of the coarser block
+    for _ in range(levels):
+        misaligned = tick % ((1 << levels) >> k) != 0
+        if not misaligned.any():
+            break
+        k[misaligned] += 1
+    return k
+
+
+# Dormand-Prince 5(4) tableau (the system is autonomous, so the stage times are not needed)
+_DP_A = (
+    (),
+    (1 / 5,),
+    (3 / 40, 9 / 40),
+    (44 / 45, -56 / 15, 32 / 9),
+    (19372 / 6561, -25360 / 2187, 64448 / 6561, -212 / 729),
+    (9017 / 3168, -355 / 33, 46732 / 5247, 49 / 176, -5103 / 18656),
+    (35 / 384, 0, 500 / 1113, 125 / 192, -2187 / 6784, 11 / 84),
+)
+_DP_E = (71 / 57600, 0, -71 / 16695, 71 / 1920, -17253 / 339200, 22 / 525, -1 / 40)
+
+
+def rk45_step(stars: Stars, h: float) -> float:
+    """Embedded Dormand-Prince 5(4) Runge-Kutta with step-size control.
+
+    Tries stars.step (capped at h); a step whose error estimate exceeds tolerance is
+    retried with a smaller size, so the returned time can be shorter than h.
+    """
+    x0, v0, a0 = stars.pos.copy(), stars.speed.copy(), stars.acceleration()
+    # position errors are measured against the neighbour distance, velocity errors
+    # against the matching circular speed sqrt(a * d)
+    x_scale = stars.nearest[:, None]
+    v_scale = np.sqrt(np.hypot(a0[:, 0], a0[:, 1]) * stars.nearest)[:, None]
+    settings = _settings(stars)
+    h_min = h / settings.max_substeps
+    h_try = min(h, stars.step or h)
+    while True:
+        kx, kv = [v0], [a0]
+        for row in _DP_A[1:6]:
+            x = x0 + h_try * sum(w * s for w, s in zip(row, kx))
+            v = v0 + h_try * sum(w * s for w, s in zip(row, kv))
+            kx.append(v)
+            kv.append(accelerations(stars, x)[0])
+        x1 = x0 + h_try * sum(w * s for w, s in zip(_DP_A[6], kx))
+        v1 = v0 + h_try * sum(w * s for w, s in zip(_DP_A[6], kv))
+        stars.pos, stars.speed = x1, v1
+        stars.force[:] = 0
+        _refresh(stars)
+        kx.append(v1)
+        kv.append(stars.acceleration())
+
+        err_x = h_try * sum(w * s for w, s in zip(_DP_E, kx))
+        err_v = h_try * sum(w * s for w, s in zip(_DP_E, kv))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            err = max(np.nan_to_num(np.abs(err_x) / x_scale).max(initial=0),
+                      np.nan_to_num(np.abs(err_v) / v_scale).max(initial=0)) / settings.tolerance
+        factor = min(5.0, max(0.2, 0.9 * err ** -0.2)) if err > 0 else 5.0
+        if err <= 1 or h_try <= h_min:
+            stars.step = h_try * factor
+            return h_try
+        h_try = max(h_try * factor, h_min)
+        stars.pos, stars.speed = x0.copy(), v0.copy()
+
+
+INTEGRATORS = {
+    "euler": euler_step,
+    "leapfrog": leapfrog_step,
+    "hermite": hermite_step,
+    "rk45": rk45_step,
+    "block": block_step,
+}
+
+
+def _refresh(stars: Stars) -> None:
+    """Re-evaluate forces and contact candidates at the current positions."""
+    stars.force[:] = 0
+    update_forces(stars, [], [])
+
+
+def _substep(stars: Stars, remaining: float) -> float:
+    """Step size for the next sub-step: a fraction eta of the shortest free-fall time."""
+    settings = _settings(stars)
+    h_min = remaining / settings.max_substeps
+    if settings.eta <= 0 or len(stars) < 2 or settings.integrator == "block":
+        return remaining
+    acc = stars.acceleration()
+    a = np.hypot(acc[:, 0], acc[:, 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_ff = np.sqrt(stars.nearest / a)
+    t_ff = t_ff[np.isfinite(t_ff)]
+    if not len(t_ff):
+        return remaining
+    # split what is left of the frame evenly rather than leaving a sliver at the end
+    n = math.ceil(remaining / max(settings.eta * t_ff.min(), h_min))
+    return remaining / n
+
+
+class KeplerOrbit:
+    """Closed-form orbit of a bound two-star system, fixed at the epoch it was computed."""
+
+    def __init__(self, stars: Stars) -> None:
+        m1, m2 = stars.mass
+        self.masses = (m1, m2)
+        self.epoch = stars.time
+        self.mu = G * (m1 + m2)
+        self.com = (m1 * stars.pos[0] + m2 * stars.pos[1]) / (m1 + m2)
+        self.com_speed = (m1 * stars.speed[0] + m2 * stars.speed[1]) / (m1 + m2)
+
+        r = stars.pos[1] - stars.pos[0]
+        v = stars.speed[1] - stars.speed[0]
+        d = math.hypot(*r)
+        energy = (v @ v) / 2 - self.mu / d
+        self.a = -self.mu / (2 * energy) if energy < 0 else math.inf
+        e_vec = ((v @ v - self.mu / d) * r - (r @ v) * v) / self.mu
+        self.e = math.hypot(*e_vec)
+
+        # orbital frame: p towards periastron, q a quarter turn further along the motion
+        self.p = e_vec / self.e if self.e > 1e-12 else r / d
+        turn = 1.0 if r[0] * v[1] - r[1] * v[0] >= 0 else -1.0
+        self.q = turn * np.array([-self.p[1], self.p[0]])
+        nu = math.atan2(r @ self.q, r @ self.p)
+        ecc = 2 * math.atan2(math.sqrt(1 - self.e) * math.sin(nu / 2), math.sqrt(1 + self.e) * math.cos(nu / 2)) \
+            if self.e < 1 else 0.0
+        self.mean_anomaly = ecc - self.e * math.sin(ecc)
+        self.mean_motion = math.sqrt(self.mu / self.a ** 3) if self.a < math.inf else 0.0
+
+    @property
+    def periastron(self) -> float:
+        return self.a * (1 - self.e)
+
+    def is_safe(self, stars: Stars) -> bool:
+        """True when the orbit is bound and never brings the stars close enough to collide or exchange mass."""
+        if not (self.e < 1 and self.a < math.inf):
+            return False
+        r_sum = stars.r[0] + stars.r[1]
+        # the same pair test as _check_contacts, at the closest point of the orbit with 1% margin
+        closest = 0.99 * self.periastron
+        if r_sum > closest:
+            return False
+        return not (stars.mass[0] > stars.mass[1] and r_sum > roche_radius(stars.mass[0], stars.mass[1], closest))
+
+    def place(self, stars: Stars, t: float) -> None:
+        """Put both stars where the orbit has them at simulated time t."""
+        e = self.e
+        mean = (self.mean_anomaly + self.mean_motion * (t - self.epoch)) % (2 * math.pi)
+        ecc = mean if e < 0.8 else math.pi
+        for _ in range(50):  # Newton on Kepler's equation E - e sin E = M
+            delta = (ecc - e * math.sin(ecc) - mean) / (1 - e * math.cos(ecc))
+            ecc -= delta
+            if abs(delta) < 1e-14:
+                break
+        cos_e, sin_e = math.cos(ecc), math.sin(ecc)
+        root = math.sqrt(1 - e * e)
+        r = self.a * ((cos_e - e) * self.p + root * sin_e * self.q)
+        v = self.a * self.mean_motion / (1 - e * cos_e) * (-sin_e * self.p + root * cos_e * self.q)
+
+        m1, m2 = self.masses
+        com = self.com + self.com_speed * (t - self.epoch)
+        stars.pos[0], stars.pos[1] = com - m2 / (m1 + m2) * r, com + m1 / (m1 + m2) * r
+        stars.speed[0], stars.speed[1] = self.com_speed - m2 / (m1 + m2) * v, self.com_speed + m1 / (m1 + m2) * v
+        stars.nearest[:] = math.hypot(*r)
+
+
+def _kepler_advance(stars: Stars, dt: float) -> bool:
+    """Advance an isolated, safe binary analytically by dt; False when it has to be integrated."""
+    if not _settings(stars).kepler or len(stars) != 2 or stars.contacts and any(stars.contacts):
+        return False
+    if stars.orbit is None or stars.orbit.masses != tuple(stars.mass):
+        stars.orbit = KeplerOrbit(stars)
+    if not stars.orbit.is_safe(stars):
+        stars.orbit = None
+        return False
+    stars.time += dt
+    stars.orbit.place(stars, stars.time)
+    stars.contacts = None  # cached forces no longer match the positions
+    stars.update_trace(dt)
+    return True
+
+
+def simulate_one_tick(stars: Stars, dt: float | None = None) -> Stars:
+    """Advance the stars by dt simulated seconds (one frame, time_speed / fps, by default)."""
+    settings = _settings(stars)
+    if dt is None:
+        dt = settings.time_speed / fps
+    stars.exchanges = []
+    stars.merges = []
+    profiler.start("integration")
+    advanced = _kepler_advance(stars, dt)
+    profiler.stop()
+    if advanced:
+        return stars
+    stars.orbit = None
+    step = INTEGRATORS[settings.integrator]
+    t = 0.0
+    while t < dt and len(stars):
+        if stars.contacts is None:
+            stars.force[:] = 0
+            update_forces(stars, [], [])
+        collides, exchanges = stars.contacts
+        stars.contacts = None
+        remove_collides(stars, collides)
+        h = _substep(stars, dt - t)
+        # rk45 may end up taking a shorter step than planned here; the difference is negligible
+        exchange_masses(stars, exchanges, EXCHANGE_FRACTION * h * fps / settings.time_speed)
+
+        stars.compress()
+        if collides:
+            # merged stars start without forces; evaluate them before stepping
+            _refresh(stars)
+        profiler.start("integration")
+        h = step(stars, h)
+        profiler.stop()
+        stars.update_trace(h)
+        stars.time += h
+        t += h
+    return stars
+
+
+class Ensemble:
+    """Many independent small systems integrated together, stacked along a leading system axis.
+
+    Every array has shape (systems, slots, ...). Systems with fewer stars than the largest one
+    are padded with dead slots; a star merged into another is masked out (alive False) instead
+    of being removed, and a system whose active flag is cleared (e.g. once its outcome is
+    known) is no longer advanced. All systems use leapfrog, whatever the integrator setting.
+    """
+
+    def __init__(self, systems: list[Stars]) -> None:
+        count = len(systems)
+        slots = max((len(s) for s in systems), default=0)
+        self.pos = np.zeros((count, slots, 2))
+        self.speed = np.zeros((count, slots, 2))
+        self.acc = np.zeros((count, slots, 2))
+        self.r = np.zeros((count, slots))
+        self.mass = np.zeros((count, slots))
+        self.alive = np.zeros((count, slots), dtype=bool)
+        self.nearest = np.full((count, slots), np.inf)
+        # contact candidates from the last force evaluation, pairs i < j
+        self.collide = np.zeros((count, slots, slots), dtype=bool)
+        self.exchange = np.zeros((count, slots, slots), dtype=bool)
+        self.color = []
+        for s, stars in enumerate(systems):
+            n = len(stars)
+            self.pos[s, :n] = stars.pos
+            self.speed[s, :n] = stars.speed
+            self.r[s, :n] = stars.r
+            self.mass[s, :n] = stars.mass
+            self.alive[s, :n] = True
+            self.color.append(stars.color + [None] * (slots - n))
+        self.active = self.alive.any(axis=1)  # systems still being advanced; clear to stop one
+        self.time = np.array([stars.time for stars in systems], dtype=float)
+        self.merges = np.zeros(count, dtype=np.int64)  # stars merged away so far, per system
+        self.exchanged = np.zeros(count, dtype=bool)  # mass transfer during the last tick
+        self.fresh = False  # acc and contacts match the current positions
+
+    def __len__(self) -> int:
+        return len(self.mass)
+
+    def system(self, s: int) -> Stars:
+        """The live stars of system s as a Stars object."""
+        stars = []
+        for i in np.flatnonzero(self.alive[s]):
+            star = Star(self.pos[s, i, 0], self.pos[s, i, 1], self.r[s, i], self.mass[s, i], self.color[s][i])
+            star.speed = list(self.speed[s, i])
+            stars.append(star)
+        result = Stars(stars)
+        result.time = float(self.time[s])
+        return result
+
+
+@profiler.timed("forces")
+def ensemble_forces(ens: Ensemble, systems: np.ndarray) -> None:
+    """Accelerations, nearest neighbours and contact candidates of the listed systems."""
+    slots = ens.mass.shape[1]
+    eye = np.eye(slots, dtype=bool)
+    upper = np.triu(np.ones((slots, slots), dtype=bool), 1)
+    # systems are processed in blocks so the pairwise arrays stay small
+    block = max(1, 4_000_000 // max(slots * slots, 1))
+    for a in range(0, len(systems), block):
+        s = systems[a:a + block]
+        pos, mass, r, alive = ens.pos[s], ens.mass[s], ens.r[s], ens.alive[s]
+        dif = pos[:, None, :, :] - pos[:, :, None, :]  # dif[s, i, j] = pos[j] - pos[i]
+        d = np.hypot(dif[..., 0], dif[..., 1])
+        pair = alive[:, :, None] & alive[:, None, :] & ~eye
+        with np.errstate(divide="ignore", invalid="ignore"):
+            w = np.where(pair & (d > 0), G * mass[:, None, :] / d ** 3, 0.0)
+        ens.acc[s] = np.einsum("sij,sijk->sik", w, dif)
+        ens.nearest[s] = np.where(pair, d, np.inf).min(axis=2)
+
+        r_sum = r[:, :, None] + r[:, None, :]
+        candidate = pair & upper & (ROCHE_REACH * r_sum > d)
+        collide = candidate & (r_sum > d)
+        exchange = candidate & ~collide & (mass[:, :, None] > mass[:, None, :])
+        if exchange.any():
+            k, i, j = np.nonzero(exchange)
+            exchange[k, i, j] = r_sum[k, i, j] > roche_radius(mass[k, i], mass[k, j], d[k, i, j])
+        ens.collide[s] = collide
+        ens.exchange[s] = exchange
+
+
+@profiler.timed("collisions")
+def ensemble_merge(ens: Ensemble) -> np.ndarray:
+    """Merge colliding pairs like remove_collides, keeping the result in the heavier star's slot.
+
+    Returns the systems that changed.
+    """
+    changed = []
+    # np.nonzero walks row-major, so pairs come in nested-loop order within each system
+    for s, i, j in zip(*np.nonzero(ens.collide)):
+        if not (ens.alive[s, i] and ens.alive[s, j]):
+            continue
+        m1, m2 = ens.mass[s, i], ens.mass[s, j]
+        keep, gone = (i, j) if m1 > m2 else (j, i)
+        ens.speed[s, keep] = (m1 * ens.speed[s, i] + m2 * ens.speed[s, j]) / (m1 + m2)
+        ens.r[s, keep] = ens.r[s, i] + ens.r[s, j]
+        ens.mass[s, keep] = m1 + m2
+        ens.alive[s, gone] = False
+        ens.mass[s, gone] = ens.r[s, gone] = 0.0
+        ens.merges[s] += 1
+        changed.append(s)
+    ens.collide[:] = False
+    return np.unique(np.array(changed, dtype=np.int64))
+
+
+@profiler.timed("exchange")
+def ensemble_exchange(ens: Ensemble, systems: np.ndarray, fraction: np.ndarray) -> None:
+    """Move fraction (one value per listed system) of each overflowing donor's mass to its partner."""
+    k, i, j = np.nonzero(ens.exchange[systems])
+    if not len(k):
+        return
+    s = systems[k]
+    amount = ens.mass[s, j] * fraction[k]
+    # r / m is unchanged by a transfer, so both radii scale with the new masses
+    for star, change in ((j, -amount), (i, amount)):
+        ratio = ens.r[s, star] / ens.mass[s, star]
+        np.add.at(ens.mass, (s, star), change)
+        ens.r[s, star] = ens.mass[s, star] * ratio
+    ens.exchanged[s] = True
+
+
+def simulate_ensemble_tick(ens: Ensemble, dt: float | np.ndarray | None = None) -> Ensemble:
+    """Advance every active system by dt simulated seconds (one value, or one per system).
+
+    Systems take kick-drift-kick leapfrog sub-steps sized by eta like simulate_one_tick, each
+    system its own; only the systems still short of the end of the tick are evaluated.
+    """
+    if dt is None:
+        dt = time_speed / fps
+    dt = np.broadcast_to(np.asarray(dt, dtype=float), ens.time.shape)
+    ens.exchanged[:] = False
+    if not ens.fresh:
+        ensemble_forces(ens, np.flatnonzero(ens.active))
+        ens.fresh = True
+    end = ens.time + dt
+    running = ens.active & (dt > 0)
+    while running.any():
+        merged = ensemble_merge(ens) if ens.collide.any() else np.zeros(0, dtype=np.int64)
+        if len(merged):
+            ensemble_forces(ens, merged[ens.active[merged]])
+        running &= ens.active
+        s = np.flatnonzero(running)
+        if not len(s):
+            break
+
+        # sub-steps: a fraction eta of each system's shortest free-fall time, splitting the rest evenly
+        remaining = end[s] - ens.time[s]
+        h = remaining
+        if eta > 0:
+            a = np.hypot(ens.acc[s, :, 0], ens.acc[s, :, 1])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t_ff = np.where(ens.alive[s] & (a > 0), np.sqrt(ens.nearest[s] / a), np.inf).min(axis=1)
+            h_min = dt[s] / max_substeps
+            n = np.ceil(remaining / np.maximum(eta * t_ff, h_min))
+            h = np.where(np.isfinite(t_ff), remaining / np.maximum(n, 1), remaining)
+        # EXCHANGE_FRACTION is per tick of each system
+        ensemble_exchange(ens, s, EXCHANGE_FRACTION * h / dt[s])
+
+        profiler.start("integration")
+        ens.speed[s] += ens.acc[s] * (h / 2)[:, None, None]
+        ens.pos[s] += ens.speed[s] * h[:, None, None]
+        ensemble_forces(ens, s)
+        ens.speed[s] += ens.acc[s] * (h / 2)[:, None, None]
+        profiler.stop()
+
+        ens.time[s] += h
+        running[s] = end[s] - ens.time[s] > 1e-9 * dt[s]
+    return ens
+
+
+def two_body(custom_stars=None, settings: Settings | None = None) -> Stars:
     if custom_stars:
         s1_data, s2_data = custom_stars
         s1 = Star(0, 19_591_000, s1_data["radius"], s1_data["mass"], s1_data["color"])
@@ -144,27 +920,178 @@ def two_body(custom_stars=None) -> list[Star]:
         s1 = Star(0, 19_591_000, 606_000, 1.52e21, 'gray')
         s2 = Star(0, 0, 1_188_000, 1.303e22, 'brown')
 
-    s1.speed[0] += 210 * time_speed / fps
-    s2.speed[0] += -24 * time_speed / fps
-    return [s1, s2]
+    s1.speed[0] += 210
+    s2.speed[0] += -24
+    return Stars([s1, s2], settings)
 
 
-def three_body(custom_stars=None) -> list[Star]:
+def three_body(custom_stars=None, inner: float = 0.074 * AE, outer: float = 2 * AE,
+               settings: Settings | None = None) -> Stars:
+    """Inner pair at (0, +-inner), third star at (outer, outer).
+
+    Speeds scale like a Kepler orbit, sqrt(default distance / distance), so changing the
+    distances keeps the shape of the default orbits for the same masses.
+    """
     if custom_stars:
         s1_data, s2_data, s3_data = custom_stars
-        s1 = Star(0, 0.074 * AE, s1_data["radius"], s1_data["mass"], s1_data["color"])
-        s2 = Star(0, -0.074 * AE, s2_data["radius"], s2_data["mass"], s2_data["color"])
-        s3 = Star(2 * AE, 2 * AE, s3_data["radius"], s3_data["mass"], s3_data["color"])
+        s1 = Star(0, inner, s1_data["radius"], s1_data["mass"], s1_data["color"])
+        s2 = Star(0, -inner, s2_data["radius"], s2_data["mass"], s2_data["color"])
+        s3 = Star(outer, outer, s3_data["radius"], s3_data["mass"], s3_data["color"])
     else:
-        s1 = Star(0, 0.074 * AE, 2.84 * RS, 2.27 * MS, 'blue')
-        s2 = Star(0, -0.074 * AE, 2.85 * RS, 2.30 * MS, 'yellow')
-        s3 = Star(2 * AE, 2 * AE, 0.8 * RS, 4.4 * MS, 'green')
+        s1 = Star(0, inner, 2.84 * RS, 2.27 * MS, 'blue')
+        s2 = Star(0, -inner, 2.85 * RS, 2.30 * MS, 'yellow')
+        s3 = Star(outer, outer, 0.8 * RS, 4.4 * MS, 'green')
+
+    v_inner = math.sqrt(0.074 * AE / inner)
+    v_outer = math.sqrt(2 * AE / outer)
+    s1.speed[0] += 51_000 * v_inner
+    s2.speed[0] += -51_000 * v_inner
+    s3.speed[0] += -10_000 * v_outer
+    s3.speed[1] += -5_000 * v_outer
+    return Stars([s3, s2, s1], settings)
+
+
+def load_config(config: dict | None) -> Stars:
+    """Apply a user_stars.json-style config to the module settings and build its stars.
+
+    Settings the config leaves out go back to DEFAULTS, so the result does not depend on
+    what was loaded before.
+    """
+    global time_speed, solver, theta, integrator, eta, tolerance, kepler, trail_length, frame_rate, workers, recorder
+    config = config or {}
+    _check_names(config.get("solver", DEFAULTS["solver"]), config.get("integrator", DEFAULTS["integrator"]))
+    time_speed = config.get("time_speed", DEFAULTS["time_speed"])
+    solver = config.get("solver", DEFAULTS["solver"])
+    theta = float(config.get("theta", DEFAULTS["theta"]))
+    integrator = config.get("integrator", DEFAULTS["integrator"])
+    eta = float(config.get("eta", DEFAULTS["eta"]))
+    tolerance = float(config.get("tolerance", DEFAULTS["tolerance"]))
+    kepler = bool(config.get("kepler", DEFAULTS["kepler"]))
+    trail_length = int(config.get("trail_length", DEFAULTS["trail_length"]))
+    frame_rate = int(config.get("frame_rate", DEFAULTS["frame_rate"]))
+    workers = int(config.get("workers", DEFAULTS["workers"]))
+    if config.get("profile"):
+        profiler.open(config["profile"])
+    if config.get("record"):
+        recorder = recording.Recorder(config["record"], int(config.get("record_every", 1)))
+    return build_stars(config)
+
+
+def build_stars(config: dict | None, settings: Settings | None = None) -> Stars:
+    """The stars of a user_stars.json-style config, simulated with settings (the module settings by default).
+
+    Unlike load_config this leaves the module settings alone; LiveSimulation passes
+    Settings(config) so every session keeps its own.
+    """
+    stars_data = (config or {}).get("stars", [])
+    if len(stars_data) == 2:
+        return two_body(stars_data, settings)
+    if len(stars_data) == 3:
+        return three_body(stars_data, config.get("inner_distance", 0.074 * AE), config.get("outer_distance", 2 * AE),
+                          settings)
+    return two_body(settings=settings)
+
+
+# module settings saved with a checkpoint, so a restored run continues exactly as before
+CHECKPOINT_SETTINGS = ("fps", "frame_rate", "k", "mouse_x", "mouse_y", "time_speed", "solver", "theta", "integrator",
+                       "eta", "tolerance", "max_substeps", "kepler", "trail_length", "workers")
+_ORBIT_ARRAYS = ("com", "com_speed", "p", "q")
+
+
+def apply_settings(settings: dict) -> None:
+    """Change module settings by name, e.g. {"time_speed": 20000}; only CHECKPOINT_SETTINGS can be set."""
+    unknown = set(settings) - set(CHECKPOINT_SETTINGS)
+    if unknown:
+        raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}.")
+    _check_names(settings.get("solver", solver), settings.get("integrator", integrator))
+    globals().update(settings)
+
+
+def save_checkpoint(stars: Stars, path: str, tick: int = 0) -> None:
+    """Write the complete simulation state and its settings (the stars' own, else the module ones) to an .npz file."""
+    orbit = None
+    if stars.orbit is not None:
+        orbit = {name: value.tolist() if isinstance(value, np.ndarray) else value
+                 for name, value in vars(stars.orbit).items()}
+    meta = {
+        "tick": tick,
+        "settings": {name: getattr(_settings(stars), name, globals()[name]) for name in CHECKPOINT_SETTINGS},
+        "time": stars.time,
+        "evaluations": stars.evaluations,
+        "step": stars.step,
+        "contacts": stars.contacts,
+        "exchanges": stars.exchanges,
+        "merges": stars.merges,
+        "orbit": orbit,
+    }
+    arrays = {name: getattr(stars, name) for name in Stars.arrays}
+    with open(path, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), color=np.array(stars.color, dtype=str), **arrays)
 
-    s1.speed[0] += 51_000 * time_speed / fps
-    s2.speed[0] += -51_000 * time_speed / fps
-    s3.speed[0] += -10_000 * time_speed / fps
-    s3.speed[1] += -5_000 * time_speed / fps
-    return [s3, s2, s1]
+
+def load_checkpoint(path: str) -> tuple[Stars, int]:
+    """Restore a checkpoint written by save_checkpoint: the module settings, the stars and the tick count."""
+    with np.load(path, allow_pickle=False) as data:
+        meta = json.loads(str(data["meta"]))
+        globals().update(meta["settings"])
+        stars = Stars()
+        for name in Stars.arrays:
+            if name in data:
+                setattr(stars, name, data[name])
+        if "mass_cbrt" not in data:  # checkpoint written before the cube roots were kept
+            stars.mass_cbrt = np.cbrt(stars.mass)
+        stars.color = [str(c) for c in data["color"]]
+    stars.trail_changes = None  # nothing drawn yet
+    stars.time = meta["time"]
+    stars.evaluations = meta["evaluations"]
+    stars.step = meta["step"]
+    if meta["contacts"] is not None:
+        stars.contacts = tuple([tuple(pair) for pair in pairs] for pairs in meta["contacts"])
+    stars.exchanges = [tuple(pair) for pair in meta["exchanges"]]
+    stars.merges = meta["merges"]
+    if meta["orbit"] is not None:
+        stars.orbit = KeplerOrbit.__new__(KeplerOrbit)
+        for name, value in meta["orbit"].items():
+            setattr(stars.orbit, name, np.array(value) if name in _ORBIT_ARRAYS else value)
+        stars.orbit.masses = tuple(stars.orbit.masses)
+    return stars, meta["tick"]
+
+
+def fast_forward(stars: Stars, until: float, tick: int = 0) -> tuple[Stars, int]:
+    """Integrate whole ticks without drawing until the simulated time reaches until; returns the stars and tick count.
+
+    While the stars move on a safe Kepler orbit (and nothing is recorded per tick), the
+    remaining ticks are covered in one analytic jump.
+    """
+    dt = _settings(stars).time_speed / fps
+    while stars.time < until and len(stars):
+        if stars.orbit is not None and recorder is None:
+            # the last tick took the Kepler path; the orbit stays safe for as long as the binary is alone
+            n = math.ceil((until - stars.time) / dt)
+            stars.exchanges = []
+            stars.merges = []
+            if _kepler_advance(stars, n * dt):
+                tick += n
+                break
+        stars = simulate_one_tick(stars)
+        tick += 1
+        if recorder is not None:
+            recorder.write(stars, tick)
+    return stars, tick
+
+
+def replay_stars(frame: recording.Frame) -> Stars:
+    """Stars of a recorded frame, ready to draw (without trails)."""
+    stars = []
+    for i in range(len(frame)):
+        star = Star(frame.pos[i, 0], frame.pos[i, 1], frame.r[i], frame.mass[i], frame.color[i])
+        star.speed = list(frame.speed[i])
+        stars.append(star)
+    stars = Stars(stars)
+    stars.time = frame.time
+    stars.exchanges = frame.exchanges
+    stars.merges = frame.merges
+    return stars
 
 
 if __name__ == '__main__':
@@ -172,42 +1099,101 @@ if __name__ == '__main__':
     screen = pygame.display.set_mode((800, 450))
     pygame.display.set_caption("Stellar Dance Simulation")
     style = pygame.font.SysFont("arial", 36)
+    small_style = pygame.font.SysFont("arial", 16)
     render_fps = style.render('fps ' + str(fps), True, 'blue')
 
+    parser = argparse.ArgumentParser(description="Stellar Dance simulation window.")
+    parser.add_argument("config", nargs="?", help="user_stars.json-style config file")
+    parser.add_argument("--replay", help="play back a recording instead of simulating")
+    parser.add_argument("--resume", help="continue from a checkpoint written with F5")
+    parser.add_argument("--until", type=float, help="integrate without drawing up to this simulated time (s) first")
+    parser.add_argument("--serve", type=int, nargs="?", const=control.DEFAULT_PORT, metavar="PORT",
+                        help="stay open and take commands from app.py on this local port (see control.py)")
+    args = parser.parse_args()
+    server = control.ControlServer(args.serve) if args.serve else None
+
     custom_config = None
-    if len(sys.argv) > 1:
+    replay = None
+    ticks = 0
+    paused = False
+    if args.config:
         try:
-            with open(sys.argv[1], "r") as f:
+            with open(args.config, "r") as f:
                 custom_config = json.load(f)
         except Exception as e:
             print("Could not load config:", e)
+    checkpoint_path = (custom_config or {}).get("checkpoint", "checkpoint.npz")
 
-    if custom_config:
-        user_time_speed = custom_config.get("time_speed", 5000)
-        globals()["time_speed"] = user_time_speed
-        stars_data = custom_config.get("stars", [])
-        if len(stars_data) == 2:
-            stars = two_body(stars_data)
-        elif len(stars_data) == 3:
-            stars = three_body(stars_data)
-        else:
-            stars = two_body()
+    if args.replay:
+        replay = recording.Replay(args.replay)
+        replay_frame = 0.0  # current frame, fractional so slow playback still advances
+        replay_speed = 1.0  # recorded frames per physics tick; negative plays backwards
+        stars = replay_stars(replay.frame(0))
     else:
-        stars = two_body()
+        stars = load_config(custom_config)
+        if args.resume:
+            stars, ticks = load_checkpoint(args.resume)
+        if recorder is not None:
+            recorder.write(stars, ticks)
+        until = args.until if args.until is not None else (custom_config or {}).get("fast_forward")
+        if until is not None:
+            stars, ticks = fast_forward(stars, float(until), ticks)
 
-    tick = 0
-    tm = time.time()
+    clock = pygame.time.Clock()
+    frame = 0
+    show_profile = False
+    profile_lines = []
+    lag = 0.0  # real seconds of physics still to run
+    view = None
+    prev_rects = []
     running = True
     while running:
-        tick += 1
-        if tick == 100:
-            tick = 0
-            render_fps = style.render("fps:" + str(int(100 / (time.time() - tm))), True, "blue")
-            tm = time.time()
+        frame += 1
+        if frame == 100:
+            frame = 0
+            render_fps = style.render("fps:" + str(int(clock.get_fps())), True, "blue")
+        if show_profile and frame % 30 == 0:
+            profile_lines = [small_style.render(line, True, "blue")
+                             for line in [f"stars: {len(stars)}  tick: {ticks}"] + profiler.summary()]
 
+        profiler.start("events")
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                running = False
+                if server is None:
+                    running = False
+                else:
+                    # a served window stays alive for the next launch from app.py
+                    paused = True
+                    pygame.display.iconify()
+
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                show_profile = not show_profile
+                profiler.enabled = show_profile or profiler.streaming
+                profile_lines = []
+
+            # F5 saves the whole state, F9 goes back to the last save
+            if replay is None and event.type == pygame.KEYDOWN and event.key == pygame.K_F5:
+                save_checkpoint(stars, checkpoint_path, ticks)
+            if replay is None and event.type == pygame.KEYDOWN and event.key == pygame.K_F9:
+                try:
+                    stars, ticks = load_checkpoint(checkpoint_path)
+                except OSError as e:
+                    print("Could not load checkpoint:", e)
+                lag = 0.0
+
+            # replay: space pauses, up/down change the speed, left/right jump 10% of the recording
+            if replay is not None and event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_SPACE:
+                    paused = not paused
+                elif event.key == pygame.K_UP:
+                    replay_speed *= 2
+                elif event.key == pygame.K_DOWN:
+                    replay_speed /= 2
+                elif event.key == pygame.K_BACKSPACE:
+                    replay_speed = -replay_speed
+                elif event.key in (pygame.K_LEFT, pygame.K_RIGHT):
+                    jump = 0.1 * len(replay) * (1 if event.key == pygame.K_RIGHT else -1)
+                    replay_frame = min(max(replay_frame + jump, 0), len(replay) - 1)
 
             if event.type == pygame.MOUSEBUTTONDOWN:
                 x = event.pos[0]
@@ -226,11 +1212,74 @@ if __name__ == '__main__':
                 if pygame.mouse.get_pressed()[0]:
                     mouse_x -= event.rel[0] * k
                     mouse_y -= event.rel[1] * k
+        profiler.stop()
 
+        for conn, command in server.poll() if server is not None else ():
+            cmd = command.get("cmd")
+            reply = {"ok": True}
+            try:
+                if cmd == "load":
+                    custom_config = control.remote_config(command.get("config"))
+                    stars, ticks, paused, lag = load_config(custom_config), 0, False, 0.0
+                    screen = pygame.display.set_mode(screen.get_size())  # brings an iconified window back
+                    view = None
+                elif cmd == "reset":
+                    stars, ticks, lag = load_config(custom_config), 0, 0.0
+                elif cmd == "set":
+                    apply_settings({name: value for name, value in command.items() if name != "cmd"})
+                elif cmd in ("pause", "resume"):
+                    paused = cmd == "pause"
+                elif cmd == "shutdown":
+                    running = False
+                elif cmd != "status":
+                    raise ValueError(f"Unknown command {cmd!r}.")
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            reply.update(tick=ticks, time=stars.time, stars=len(stars), paused=paused)
+            server.reply(conn, reply)
+
+        # physics runs fixed ticks of time_speed / fps simulated seconds, as many as the wall clock
+        # asks for, independently of how often the screen is redrawn
+        lag = min(lag + clock.tick(frame_rate) / 1000, 0.25)
+        if replay is not None:
+            # recorded frames are shown, never integrated; seeking is a lookup in the index
+            if not paused:
+                replay_frame = min(max(replay_frame + lag * fps * replay_speed, 0), len(replay) - 1)
+            lag = 0.0
+            if replay.ticks[int(replay_frame)] != ticks:
+                stars = replay_stars(replay.frame(int(replay_frame)))
+                ticks = int(replay.ticks[int(replay_frame)])
+        if paused:
+            lag = 0.0
+        while lag >= 1 / fps:
+            stars = simulate_one_tick(stars)
+            ticks += 1
+            lag -= 1 / fps
+            if recorder is not None:
+                recorder.write(stars, ticks)
+
+        profiler.start("rendering")
         screen.fill("black")
-        stars = simulate_one_tick(stars)
-        screen.blit(render_fps, (10, 10))
-        pygame.display.update()
+        rects = stars.draw()
+        text_rect = screen.blit(render_fps, (10, 10))
+        for row, line in enumerate(profile_lines):
+            rects = None  # the overlay sits on top of everything; refresh the whole window
+            screen.blit(line, (10, 50 + 18 * row))
+        if rects is None or view != (k, mouse_x, mouse_y) or len(rects) + len(prev_rects) > 200:
+            pygame.display.update()
+            prev_rects = []
+        else:
+            rects.append(text_rect)
+            pygame.display.update(rects + prev_rects)
+            prev_rects = rects
+        view = (k, mouse_x, mouse_y)
+        profiler.stop()
+        profiler.record(ticks, len(stars))
+    profiler.close()
+    if recorder is not None:
+        recorder.close()
+    if server is not None:
+        server.close()
     pygame.quit()
 
 
@@ -0,0 +1,131 @@
+"""Run the gravity.py physics without a window.
+
+    python headless.py user_stars.json --ticks 100000 --out result.json
+    python headless.py user_stars.json --seconds 3.15e7
+    python headless.py user_stars.json --ticks 100000 --record run.rec
+    python headless.py user_stars.json --seconds 3.6e6 --checkpoint later.npz
+    python headless.py user_stars.json --ticks 1000 --resume later.npz
+
+or from Python:
+
+    import headless
+    result = headless.run(config, ticks=100_000)
+"""
+from __future__ import annotations
+import argparse
+import json
+import math
+import time
+
+import gravity
+import recording
+
+
+def state(stars: gravity.Stars) -> list[dict]:
+    """Positions (m), velocities (m/s), masses and radii of the stars."""
+    return [
+        {
+            "x": float(stars.pos[i, 0]),
+            "y": float(stars.pos[i, 1]),
+            "vx": float(stars.speed[i, 0]),
+            "vy": float(stars.speed[i, 1]),
+            "mass": float(stars.mass[i]),
+            "radius": float(stars.r[i]),
+            "color": stars.color[i],
+        }
+        for i in range(len(stars))
+    ]
+
+
+def run(config: dict | None, ticks: int | None = None, seconds: float | None = None,
+        profile: str | None = None, record: str | None = None, resume: str | None = None,
+        checkpoint: str | None = None) -> dict:
+    """Integrate a user_stars.json-style config for `ticks` ticks or `seconds` of simulated time.
+
+    With profile, per-phase timings of every tick are written there (CSV or JSON lines).
+    With record, the trajectory is recorded there for replay (see recording.py).
+    With resume, the run continues from that checkpoint (its settings override the config),
+    and with checkpoint the final state is saved there. Every run starts from its own
+    settings (gravity.Settings), whatever ran before it in the process.
+    """
+    config = config or {}
+    stars = gravity.build_stars(config, gravity.Settings(config))
+    gravity.workers = int(config.get("workers", gravity.DEFAULTS["workers"]))
+    first = 0
+    if resume:
+        stars, first = gravity.load_checkpoint(resume)  # sets the module settings to the checkpoint's
+        stars.settings = gravity.Settings({name: getattr(gravity, name) for name in gravity.SIMULATION_SETTINGS})
+    profile = profile or config.get("profile")
+    record = record or config.get("record")
+    if profile:
+        gravity.profiler.open(profile)
+    recorder = None
+    if record:
+        # a resumed run continues the recording of the run it resumes
+        recorder = recording.Recorder(record, int(config.get("record_every", 1)), append=bool(resume))
+        recorder.write(stars, first)
+    dt = stars.settings.time_speed / gravity.fps
+    if ticks is None:
+        if seconds is None:
+            raise ValueError("Give either ticks or seconds.")
+        ticks = math.ceil(seconds / dt)
+
+    n_start = len(stars)
+    exchange_ticks = 0
+    tm = time.perf_counter()
+    for tick in range(ticks):
+        stars = gravity.simulate_one_tick(stars)
+        exchange_ticks += bool(stars.exchanges)
+        gravity.profiler.record(first + tick + 1, len(stars))
+        if recorder is not None:
+            recorder.write(stars, first + tick + 1)
+    wall = time.perf_counter() - tm
+    gravity.profiler.close()
+    if recorder is not None:
+        recorder.close()
+    if checkpoint:
+        gravity.save_checkpoint(stars, checkpoint, first + ticks)
+
+    return {
+        "stars": state(stars),
+        "stats": {
+            "ticks": ticks,
+            "simulated_seconds": ticks * dt,
+            "wall_seconds": wall,
+            "ticks_per_second": ticks / wall if wall > 0 else float("inf"),
+            "stars_start": n_start,
+            "stars_end": len(stars),
+            "exchange_ticks": exchange_ticks,
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run a Stellar Dance simulation without rendering.")
+    parser.add_argument("config", help="user_stars.json-style config file")
+    length = parser.add_mutually_exclusive_group(required=True)
+    length.add_argument("--ticks", type=int, help="number of ticks to integrate")
+    length.add_argument("--seconds", type=float, help="simulated seconds to integrate")
+    parser.add_argument("--out", help="write the result JSON here instead of stdout")
+    parser.add_argument("--profile", help="write per-phase timings of every tick here (.csv or JSON lines)")
+    parser.add_argument("--record", help="record the trajectory here for replay with gravity.py --replay")
+    parser.add_argument("--resume", help="continue from this checkpoint")
+    parser.add_argument("--checkpoint", help="save the final state here (resume with --resume or gravity.py --resume)")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        config = json.load(f)
+    result = run(config, ticks=args.ticks, seconds=args.seconds, profile=args.profile, record=args.record,
+                 resume=args.resume, checkpoint=args.checkpoint)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        stats = result["stats"]
+        print(f"{stats['ticks']} ticks in {stats['wall_seconds']:.2f} s ({stats['ticks_per_second']:.0f} ticks/s)")
+    else:
+        print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
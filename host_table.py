@@ -0,0 +1,107 @@
+"""Local copy of the NASA Exoplanet Archive host star masses and radii.
+
+download() fetches hostname, st_mass and st_rad of pscomppars and ps once and stores
+one row per host in a small .npz file, sorted by upper-case name. HostTable searches
+that index by exact name, case-insensitively or by prefix without any network access.
+
+    table = HostTable.download(Path.home() / ".stellar_dance" / "host_stars.npz")
+    table.resolve("kepler-10")  # ("Kepler-10", 0.91, 1.065)
+    table.suggest("HD 20")      # ["HD 200964", "HD 202206", ...]
+"""
+from __future__ import annotations
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+from lookup_cache import normalize
+import queries
+
+TABLES = ("pscomppars", "ps")  # earlier tables win when a host is in several
+DOWNLOAD_TIMEOUT = 120.0  # seconds for the whole download
+
+
+class HostTable:
+    """Hostnames with stellar mass (M_sun) and radius (R_sun), indexed by normalized name."""
+
+    def __init__(self, names: np.ndarray, mass: np.ndarray, radius: np.ndarray, downloaded: float) -> None:
+        self.names = names
+        self.keys = np.array([normalize(n) for n in names])
+        self.mass = mass
+        self.radius = radius
+        self.downloaded = downloaded  # Unix time of the download
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def load(cls, path: str | Path) -> HostTable:
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["names"], data["mass"], data["radius"], float(data["downloaded"]))
+
+    @classmethod
+    def download(cls, path: str | Path, timeout: float = DOWNLOAD_TIMEOUT) -> HostTable:
+        """Fetch the host columns of TABLES and save them to path (replacing an older copy).
+
+        Runs through queries.first_usable, so it raises TimeoutError after timeout seconds
+        instead of blocking the caller; each HTTP request of it is bounded by the same time.
+        """
+        return queries.first_usable([lambda: cls._download(path, timeout)], timeout)
+
+    @classmethod
+    def _download(cls, path: str | Path, timeout: float) -> HostTable:
+        from astroquery.nasa_exoplanet_archive import NasaExoplanetArchive
+        archive = queries.bounded(NasaExoplanetArchive(), timeout)
+
+        rows = {}
+        for table in TABLES:
+            df = archive.query_criteria(table=table, select="hostname,st_mass,st_rad").to_pandas()
+            for name, mass, radius in df.dropna(subset=["st_mass", "st_rad"]).itertuples(index=False):
+                rows.setdefault(normalize(name), (str(name), float(mass), float(radius)))
+        order = sorted(rows)
+        names = np.array([rows[key][0] for key in order], dtype=str)
+        mass = np.array([rows[key][1] for key in order])
+        radius = np.array([rows[key][2] for key in order])
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez_compressed(tmp, names=names, mass=mass, radius=radius, downloaded=time.time())
+        os.replace(tmp, path)
+        return cls(names, mass, radius, time.time())
+
+    def _range(self, prefix: str) -> tuple[int, int]:
+        """Rows whose key starts with the normalized prefix."""
+        lo = int(np.searchsorted(self.keys, prefix, side="left"))
+        hi = int(np.searchsorted(self.keys, prefix + "\U0010ffff", side="left"))
+        return lo, hi
+
+    def find(self, name: str) -> tuple[str, float, float] | None:
+        """Row of the host named exactly name (ignoring case and extra spaces)."""
+        key = normalize(name)
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            return str(self.names[i]), float(self.mass[i]), float(self.radius[i])
+        return None
+
+    def resolve(self, name: str) -> tuple[str, float, float]:
+        """Exact match, else the first host starting with name, like the archive's LIKE 'name%'.
+
+        Raises ValueError when nothing matches.
+        """
+        row = self.find(name)
+        if row is not None:
+            return row
+        lo, hi = self._range(normalize(name))
+        if lo == hi:
+            raise ValueError("No mass/radius found for this hostname in PS tables.")
+        return str(self.names[lo]), float(self.mass[lo]), float(self.radius[lo])
+
+    def suggest(self, prefix: str, limit: int = 20) -> list[str]:
+        """Up to limit hostnames starting with prefix, in alphabetical order."""
+        key = normalize(prefix)
+        if not key:
+            return []
+        lo, hi = self._range(key)
+        return [str(n) for n in self.names[lo:min(hi, lo + limit)]]
@@ -0,0 +1,86 @@
+"""Server-side live simulation for the browser view in app.py.
+
+A LiveSimulation runs the gravity.py physics in a daemon thread at a fixed number of
+frames per real second and keeps the recent frames; app.py fetches the new ones on a
+timer and hands them, packed by encode(), to the live_canvas component, which plays
+them back. The thread stops by itself once nobody has fetched frames for a while,
+e.g. after the browser tab was closed.
+"""
+from __future__ import annotations
+import base64
+import collections
+import copy
+import threading
+import time
+import uuid
+
+import numpy as np
+
+import gravity
+
+FRAME_RATE = 30  # frames per real second sent to the browser
+BUFFER_SECONDS = 10  # frames kept for a client that fell behind
+IDLE_TIMEOUT = 60.0  # real seconds without a fetch before the thread stops
+
+
+class LiveSimulation:
+    """One session's simulation, advanced in the background independently of Streamlit reruns."""
+
+    def __init__(self, config: dict) -> None:
+        self.config = copy.deepcopy(config)  # the app edits its star dicts in place
+        self.id = uuid.uuid4().hex  # tells the canvas that frame numbers start over
+        # settings of its own: other sessions' simulations run in the same process
+        self.settings = gravity.Settings(self.config)
+        self._stars = gravity.build_stars(self.config, self.settings)
+        self._dt = self.settings.time_speed / FRAME_RATE  # simulated seconds per frame
+        self._frames = collections.deque(maxlen=FRAME_RATE * BUFFER_SECONDS)
+        self._next = 0  # number of the next frame produced
+        self._lock = threading.Lock()
+        self._fetched = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="live-simulation", daemon=True)
+        self._thread.start()
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        next_time = time.monotonic()
+        while not self._stop.is_set() and time.monotonic() - self._fetched < IDLE_TIMEOUT:
+            stars = self._stars
+            if len(stars):
+                stars = self._stars = gravity.simulate_one_tick(stars, self._dt)
+            frame = (stars.time, np.column_stack((stars.pos, stars.r)).astype(np.float32), list(stars.color))
+            with self._lock:
+                self._frames.append((self._next, frame))
+                self._next += 1
+            # fixed real-time rate; a slow step is not caught up, the stream just runs slower
+            next_time = max(next_time + 1 / FRAME_RATE, time.monotonic())
+            self._stop.wait(next_time - time.monotonic())
+
+    def fetch(self, after: int) -> tuple[int, list]:
+        """Frames numbered after `after` (-1 for all kept ones), and the number of the last one."""
+        self._fetched = time.monotonic()
+        with self._lock:
+            frames = [frame for number, frame in self._frames if number > after]
+            return self._next - 1, frames
+
+
+def encode(frames: list) -> dict:
+    """Pack frames for the canvas: float32 x, y, r of every star as base64, colors as palette indices."""
+    palette = sorted({color for _, _, colors in frames for color in colors})
+    index = {color: c for c, color in enumerate(palette)}
+    rows = np.concatenate([data for _, data, _ in frames]) if frames else np.zeros((0, 3), np.float32)
+    color = np.array([index[c] for _, _, colors in frames for c in colors], dtype=np.uint8)
+    return {
+        "counts": [len(data) for _, data, _ in frames],
+        "times": [t for t, _, _ in frames],
+        "xyr": base64.b64encode(rows.astype("<f4").tobytes()).decode("ascii"),
+        "color": base64.b64encode(color.tobytes()).decode("ascii"),
+        "palette": palette,
+        "frame_rate": FRAME_RATE,
+    }
@@ -0,0 +1,123 @@
+"""Memory and disk cache for database lookups in app.py.
+
+Entries are keyed by a normalized name and kept in one JSON file, so they survive
+restarts of the app. Found and not-found results are both cached (the latter for a
+shorter time); expired entries are still served when the database cannot be reached
+or the cache is in offline mode.
+
+    cache = LookupCache(Path.home() / ".stellar_dance" / "nasa_hosts.json")
+    mass, radius, name = cache.lookup(normalize(hostname), lambda: query(hostname))
+"""
+from __future__ import annotations
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_TTL = 30 * 24 * 3600  # seconds a found result stays fresh
+NEGATIVE_TTL = 24 * 3600  # seconds a "not found" stays fresh
+MAX_ENTRIES = 2000
+
+
+def normalize(name: str) -> str:
+    """Cache key of a star name: case and repeated whitespace do not matter."""
+    return " ".join((name or "").split()).upper()
+
+
+class LookupCache:
+    """Results of fetch functions by key; a fetch raising ValueError means "not found" and is cached too."""
+
+    def __init__(self, path: str | Path, ttl: float = DEFAULT_TTL, negative_ttl: float = NEGATIVE_TTL,
+                 max_entries: int = MAX_ENTRIES, offline: bool = False) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.offline = offline  # never fetch; serve whatever is cached, however old
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str, stale: bool = False) -> dict | None:
+        """Entry of key ({"found": ..., "value": ...}) if it is fresh, or at all with stale; else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+        ttl = self.ttl if entry["found"] else self.negative_ttl
+        if not stale and time.time() - entry["stored"] >= ttl:
+            return None
+        entry["used"] = time.time()
+        return entry
+
+    def put(self, key: str, value, found: bool = True) -> None:
+        """Store a result fetched outside lookup(), e.g. one of a batch query."""
+        self._store(key, {"found": found, "value": value})
+
+    def lookup(self, key: str, fetch, offline: bool | None = None):
+        """Cached value of key, calling fetch() when there is no fresh entry.
+
+        Raises ValueError for a (cached) not-found result, and LookupError in offline
+        mode (self.offline unless given) when key was never looked up. Other errors of
+        fetch (network) fall back to an expired entry when there is one.
+        """
+        offline = self.offline if offline is None else offline
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            ttl = self.ttl if entry["found"] else self.negative_ttl
+            if offline or time.time() - entry["stored"] < ttl:
+                return self._use(key, entry)
+        if offline:
+            raise LookupError(f"{key} is not cached and the lookup is offline.")
+
+        try:
+            value = fetch()
+        except ValueError as e:
+            self._store(key, {"found": False, "value": str(e)})
+            raise
+        except Exception:
+            if entry is None:
+                raise
+            return self._use(key, entry)  # stale, but better than nothing while the database is down
+        self._store(key, {"found": True, "value": value})
+        return value
+
+    def _use(self, key: str, entry: dict):
+        with self._lock:
+            entry["used"] = time.time()
+        if not entry["found"]:
+            raise ValueError(entry["value"])
+        return entry["value"]
+
+    def _store(self, key: str, entry: dict) -> None:
+        entry["stored"] = entry["used"] = time.time()
+        with self._lock:
+            self._entries[key] = entry
+            if len(self._entries) > self.max_entries:
+                # least recently used first
+                for old in sorted(self._entries, key=lambda k: self._entries[k]["used"])[:len(self._entries) - self.max_entries]:
+                    del self._entries[old]
+            self._save()
+
+    def _save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp, self.path)  # readers never see a half-written file
+        except OSError:
+            pass  # a read-only disk only costs the persistence, not the lookup
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries = {}
+            self._save()
@@ -0,0 +1,88 @@
+from __future__ import annotations
+import csv
+import functools
+import json
+import time
+
+PHASES = ("forces", "collisions", "exchange", "integration", "trails", "rendering", "events")
+
+
+class Profiler:
+    """Wall time spent in each simulation phase, with nested phases counted only once.
+
+    Time inside a phase started within another phase is charged to the inner one
+    (forces evaluated by an integrator count as "forces", not "integration").
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.totals = dict.fromkeys(PHASES, 0.0)
+        self.average = dict.fromkeys(PHASES, 0.0)  # seconds per record, smoothed
+        self._stack = []
+        self._file = None
+        self._writer = None
+
+    def start(self, name: str) -> None:
+        if self.enabled:
+            self._stack.append((name, time.perf_counter(), 0.0))
+
+    def stop(self) -> None:
+        if not self._stack:
+            return
+        name, started, inner = self._stack.pop()
+        elapsed = time.perf_counter() - started
+        self.totals[name] = self.totals.get(name, 0.0) + elapsed - inner
+        if self._stack:
+            parent, parent_started, parent_inner = self._stack[-1]
+            self._stack[-1] = (parent, parent_started, parent_inner + elapsed)
+
+    @property
+    def streaming(self) -> bool:
+        return self._file is not None
+
+    def timed(self, name: str):
+        """Decorator charging every call of the function to the phase name."""
+        def wrap(func):
+            @functools.wraps(func)
+            def timed_func(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                self.start(name)
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.stop()
+            return timed_func
+        return wrap
+
+    def open(self, path: str) -> None:
+        """Stream every record to path: CSV for *.csv, JSON lines otherwise."""
+        self.close()
+        self.enabled = True
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        if path.lower().endswith(".csv"):
+            self._writer = csv.writer(self._file)
+            self._writer.writerow(("tick", "stars") + tuple(f"{p}_ms" for p in PHASES))
+
+    def record(self, tick: int, stars: int) -> None:
+        """Close the current record (a frame or a tick) and start a new one."""
+        if not self.enabled:
+            return
+        for p in PHASES:
+            self.average[p] += 0.05 * (self.totals[p] - self.average[p])
+        if self._file is not None:
+            ms = [round(self.totals[p] * 1000, 4) for p in PHASES]
+            if self._writer is not None:
+                self._writer.writerow([tick, stars] + ms)
+            else:
+                self._file.write(json.dumps({"tick": tick, "stars": stars, **dict(zip((f"{p}_ms" for p in PHASES), ms))}) + "\n")
+        self.totals = dict.fromkeys(PHASES, 0.0)
+
+    def summary(self) -> list[str]:
+        """One "phase: x.xx ms" line per phase, from the smoothed averages."""
+        return [f"{p}: {self.average[p] * 1000:.2f} ms" for p in PHASES]
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+        self._file = self._writer = None
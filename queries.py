@@ -0,0 +1,176 @@
+"""Concurrent, time-bounded queries to the NASA Exoplanet Archive and SIMBAD.
+
+Candidate queries run side by side on a shared thread pool; a query that does not
+answer within the timeout is abandoned so a slow archive cannot hold up the app for
+longer than that. The HTTP requests of the astroquery clients carry the same timeout,
+so an abandoned query also gives its pool thread back instead of hanging on a socket.
+"""
+from __future__ import annotations
+import concurrent.futures
+import time
+
+import numpy as np
+
+from lookup_cache import LookupCache, normalize
+
+TIMEOUT = 10.0  # seconds per lookup
+_pool = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="query")
+
+
+def bounded(client, timeout: float):
+    """An astroquery client whose HTTP requests, its TAP (pyvo) ones included, time out after timeout.
+
+    The timeout applies to connecting and to each wait for data, not to the whole transfer.
+    """
+    from requests.adapters import HTTPAdapter
+
+    class TimeoutAdapter(HTTPAdapter):
+        def send(self, request, **kwargs):
+            if kwargs.get("timeout") is None:
+                kwargs["timeout"] = timeout
+            return super().send(request, **kwargs)
+
+    client.TIMEOUT = timeout
+    adapter = TimeoutAdapter()
+    client._session.mount("http://", adapter)
+    client._session.mount("https://", adapter)
+    return client
+
+
+def first_usable(calls: list, timeout: float = TIMEOUT):
+    """Run all calls concurrently and return the result of the earliest call in the list that succeeds.
+
+    A call fails by raising or returning None. Later calls are only waited for while an
+    earlier one is still running, so a fast exact match is not held up by slow fallbacks.
+    Raises ValueError when every call failed, with the first error raised (if any) as its
+    __cause__, and TimeoutError when the ones left ran out of time.
+    """
+    futures = [_pool.submit(call) for call in calls]
+    deadline = time.monotonic() + timeout
+    errors = []
+    for future in futures:
+        try:
+            result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except concurrent.futures.TimeoutError:
+            for f in futures:
+                f.cancel()
+            raise TimeoutError(f"no answer within {timeout:.0f} s") from None
+        except Exception as e:
+            errors.append(e)
+            continue
+        if result is not None:
+            for f in futures:
+                f.cancel()
+            return result
+    raise ValueError("No usable answer.") from (errors[0] if errors else None)
+
+
+def nasa_host(name: str, timeout: float = TIMEOUT) -> tuple[str, float, float]:
+    """Host star (hostname, mass in M_sun, radius in R_sun) from the Planetary Systems tables.
+
+    Exact and prefix matches in pscomppars and ps are queried at once; an exact match
+    is preferred over a prefix match and pscomppars over ps. Raises ValueError if not found.
+    """
+    from astroquery.nasa_exoplanet_archive import NasaExoplanetArchive
+    archive = bounded(NasaExoplanetArchive(), timeout)
+
+    def query(table: str, where: str):
+        def run():
+            res = archive.query_criteria(table=table, select="hostname,st_mass,st_rad", where=where)
+            df = res.to_pandas().dropna(subset=["st_mass", "st_rad"]) if len(res) else None
+            if df is None or df.empty:
+                return None
+            row = df.iloc[0]
+            return str(row["hostname"]), float(row["st_mass"]), float(row["st_rad"])
+        return run
+
+    escaped = name.replace("'", "''")
+    calls = [query(table, where) for table in ("pscomppars", "ps")
+             for where in (f"upper(hostname)=upper('{escaped}')", f"upper(hostname) LIKE upper('{escaped}%')")]
+    try:
+        return first_usable(calls, timeout)
+    except ValueError as e:
+        if e.__cause__ is not None:
+            raise e.__cause__  # a table could not be searched, so this is not a "not found"
+        raise ValueError("No mass/radius found for this hostname in PS tables.") from None
+
+
+def _text(value) -> str | None:
+    """A SIMBAD table cell as str; None for masked or empty cells."""
+    if value is None or np.ma.is_masked(value):
+        return None
+    if isinstance(value, bytes):
+        value = value.decode()
+    value = str(value).strip()
+    return value or None
+
+
+def _column(table, *names):
+    for name in names:
+        if name in table.colnames:
+            return table[name]
+    return None
+
+
+def simbad_spectral_types(names: list[str], cache: LookupCache | None = None,
+                          timeout: float = TIMEOUT) -> dict[str, str | None]:
+    """Spectral type of every name SIMBAD knows (None when it has no spectral type for it).
+
+    Unknown names are left out of the result. Names not in the cache are resolved together
+    in one SIMBAD request. When that request fails, expired cache entries are used where
+    there are any; otherwise the error is raised.
+    """
+    result = {}
+    missing = []
+    for name in names:
+        entry = cache.get(normalize(name)) if cache is not None else None
+        if entry is not None:
+            if entry["found"]:
+                result[name] = entry["value"]
+        elif name not in missing:
+            missing.append(name)
+    if not missing:
+        return result
+
+    def run():
+        from astroquery.simbad import Simbad
+        s = bounded(Simbad(), timeout)
+        s.add_votable_fields("sptype")
+        return s.query_objects(missing)
+
+    error = None
+    try:
+        table = first_usable([run], timeout)
+    except ValueError as e:
+        table = None  # SIMBAD answered, but knows none of the names...
+        error = e.__cause__  # ...unless the request failed
+    except Exception as e:
+        error = e
+    if error is not None:
+        stale = {name: cache.get(normalize(name), stale=True) if cache is not None else None for name in missing}
+        if not all(stale.values()):
+            raise error
+        result.update({name: e["value"] for name, e in stale.items() if e["found"]})
+        return result
+
+    found = {}
+    if table is not None and len(table):
+        sptype = _column(table, "sp_type", "SP_TYPE")
+        ids = _column(table, "user_specified_id", "SCRIPT_NUMBER_ID")
+        main_id = _column(table, "main_id", "MAIN_ID")
+        for row in range(len(table)):
+            if main_id is not None and _text(main_id[row]) is None:
+                continue  # newer astroquery returns an empty row for an unknown name
+            if ids is None:
+                name = missing[row]  # rows follow the request order
+            elif ids.name == "SCRIPT_NUMBER_ID":
+                name = missing[int(ids[row]) - 1]
+            else:
+                name = next((n for n in missing if normalize(n) == normalize(_text(ids[row]) or "")), None)
+            if name is not None and name not in found:
+                found[name] = _text(sptype[row]) if sptype is not None else None
+    for name in missing:
+        if cache is not None:
+            cache.put(normalize(name), found.get(name), found=name in found)
+    result.update(found)
+    return result
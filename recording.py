@@ -0,0 +1,164 @@
+"""Append-only trajectory recording and memory-mapped replay.
+
+A recording is a data file of 8-byte aligned records plus an index file next to it
+(path + ".idx") holding one (offset, kind, tick) entry per record. Frame records carry
+the state of every star after a tick and the merges and mass exchanges of that tick;
+color records name a color the first time a frame uses it (rows is the byte length of
+the name, events its palette index). Ticks increase through a recording, so seek()
+can search them.
+
+    with Recorder("run.rec") as rec:
+        rec.write(stars, tick)
+
+    replay = Replay("run.rec")
+    frame = replay.frame(replay.seek(5000))
+"""
+from __future__ import annotations
+import os
+
+import numpy as np
+
+MAGIC = b"SDREC\x001\x00"
+FRAME, COLOR = 0, 1  # record kinds
+MERGE, EXCHANGE = 0, 1  # event kinds
+HEADER = np.dtype([("kind", "<i8"), ("tick", "<i8"), ("time", "<f8"), ("rows", "<i8"), ("events", "<i8")])
+INDEX = np.dtype([("offset", "<i8"), ("kind", "<i8"), ("tick", "<i8")])
+COLUMNS = 7  # x, y, vx, vy, mass, r, color id
+
+
+class Recorder:
+    """Appends the state of a Stars object to a recording, one frame per write().
+
+    A new recording replaces an older file at path; with append, a run resumed from a
+    checkpoint continues it instead, and ticks it already holds are not written again.
+    """
+
+    def __init__(self, path: str, every: int = 1, append: bool = False) -> None:
+        self.every = max(1, every)
+        self._last = -1  # last tick in the file
+        self._colors = {}
+        if append and os.path.exists(path) and os.path.getsize(path) > len(MAGIC):
+            replay = Replay(path)
+            self._colors = {name: c for c, name in enumerate(replay.colors)}
+            self._last = int(replay.ticks[-1]) if len(replay) else -1
+            del replay  # drop the memory map before writing to the file
+        mode = "ab" if self._colors or self._last >= 0 else "wb"
+        self._data = open(path, mode)
+        self._index = open(path + ".idx", mode)
+        if not self._data.tell():
+            self._data.write(MAGIC)
+
+    def write(self, stars, tick: int) -> None:
+        """Record the stars after tick, with stars.merges and stars.exchanges as its events."""
+        if tick % self.every or tick <= self._last:
+            return
+        for name in stars.color:
+            if name not in self._colors:
+                encoded = name.encode("utf-8")
+                self._append(COLOR, tick, 0.0, len(encoded), len(self._colors), encoded)
+                self._colors[name] = len(self._colors)
+
+        rows = np.empty((len(stars), COLUMNS))
+        rows[:, 0:2] = stars.pos
+        rows[:, 2:4] = stars.speed
+        rows[:, 4] = stars.mass
+        rows[:, 5] = stars.r
+        rows[:, 6] = [self._colors[name] for name in stars.color]
+        events = [(MERGE, i, -1) for i in stars.merges] + [(EXCHANGE, i, j) for i, j in stars.exchanges]
+        events = np.array(events, dtype="<i8").reshape(-1, 3)
+        self._append(FRAME, tick, stars.time, len(rows), len(events), rows.astype("<f8").tobytes() + events.tobytes())
+        self._last = tick
+
+    def _append(self, kind: int, tick: int, time: float, rows: int, events: int, body: bytes) -> None:
+        offset = self._data.tell()
+        header = np.array([(kind, tick, time, rows, events)], dtype=HEADER)
+        self._data.write(header.tobytes() + body + b"\x00" * (-len(body) % 8))
+        self._index.write(np.array([(offset, kind, tick)], dtype=INDEX).tobytes())
+
+    def flush(self) -> None:
+        self._data.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        if not self._data.closed:
+            self._data.close()
+            self._index.close()
+
+    def __enter__(self) -> Recorder:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class Frame:
+    """One recorded tick: star arrays (views into the mapped file) and the tick's events."""
+
+    def __init__(self, tick: int, time: float, rows: np.ndarray, events: np.ndarray, palette: list[str]) -> None:
+        self.tick = tick
+        self.time = time
+        self.pos = rows[:, 0:2]
+        self.speed = rows[:, 2:4]
+        self.mass = rows[:, 4]
+        self.r = rows[:, 5]
+        self.color = [palette[int(c)] for c in rows[:, 6]]
+        self.merges = [int(i) for kind, i, _ in events if kind == MERGE]
+        self.exchanges = [(int(i), int(j)) for kind, i, j in events if kind == EXCHANGE]
+
+    def __len__(self) -> int:
+        return len(self.mass)
+
+
+class Replay:
+    """Random access to the frames of a recording, read through a memory map."""
+
+    def __init__(self, path: str) -> None:
+        self._map = np.memmap(path, dtype=np.uint8, mode="r")
+        if bytes(self._map[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f"{path} is not a Stellar Dance recording.")
+        index = np.fromfile(path + ".idx", dtype=INDEX) if os.path.exists(path + ".idx") else self._scan()
+        # a crash may leave a record without its index entry, or an index entry past the data
+        index = index[index["offset"] + HEADER.itemsize <= len(self._map)]
+        self._offsets = index["offset"][index["kind"] == FRAME]
+        self.ticks = index["tick"][index["kind"] == FRAME]
+        self.colors = []
+        for offset in index["offset"][index["kind"] == COLOR]:
+            header = self._header(offset)
+            start = offset + HEADER.itemsize
+            self.colors.append(bytes(self._map[start:start + header["rows"]]).decode("utf-8"))
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def _header(self, offset: int) -> np.void:
+        return np.frombuffer(self._map, dtype=HEADER, count=1, offset=offset)[0]
+
+    def _scan(self) -> np.ndarray:
+        """Rebuild the index by walking the record headers."""
+        entries = []
+        offset = len(MAGIC)
+        while offset + HEADER.itemsize <= len(self._map):
+            header = self._header(offset)
+            if header["kind"] == FRAME:
+                size = 8 * (COLUMNS * header["rows"] + 3 * header["events"])
+            else:
+                size = header["rows"] + (-header["rows"] % 8)
+            if offset + HEADER.itemsize + size > len(self._map):
+                break
+            entries.append((offset, header["kind"], header["tick"]))
+            offset += HEADER.itemsize + int(size)
+        return np.array(entries, dtype=INDEX)
+
+    def seek(self, tick: int) -> int:
+        """Number of the last frame recorded at or before tick (the first one if none is)."""
+        return max(0, int(np.searchsorted(self.ticks, tick, side="right")) - 1)
+
+    def frame(self, f: int) -> Frame:
+        offset = int(self._offsets[f])
+        header = self._header(offset)
+        start = offset + HEADER.itemsize
+        rows = np.frombuffer(self._map, dtype="<f8", count=COLUMNS * header["rows"], offset=start)
+        events = np.frombuffer(self._map, dtype="<i8", count=3 * header["events"],
+                               offset=start + rows.nbytes)
+        return Frame(int(header["tick"]), float(header["time"]), rows.reshape(-1, COLUMNS),
+                     events.reshape(-1, 3), self.colors)
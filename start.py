@@ -1,26 +1,128 @@
 import os
+import sys
+import socket
+import argparse
+import secrets
 import subprocess
 import webbrowser
 import time
+import urllib.request
 from pathlib import Path
 
+import control
+
 project_path = Path(__file__).resolve().parent
 os.chdir(project_path)
 
-print("🚀 Launching Stellar Dance Interface...")
-print(f"Project folder: {project_path}")
-print("Starting Streamlit server...")
+PORTS = range(8501, 8601)
+CONTROL_PORTS = range(control.DEFAULT_PORT, control.DEFAULT_PORT + 100)  # one simulator window per instance
+HEALTH_PATHS = ("/_stcore/health", "/healthz")  # current Streamlit, then releases before 1.18
+LOG_DIR = project_path / "logs"
+
+
+def free_port(taken: set, ports: range = PORTS) -> int:
+    """First port of ports that nothing listens on and this launcher has not handed out."""
+    for port in ports:
+        if port in taken:
+            continue
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            try:
+                s.bind(("127.0.0.1", port))
+            except OSError:
+                continue
+        return port
+    raise RuntimeError(f"No free port between {ports.start} and {ports.stop - 1}.")
+
+
+def start_server(port: int, env: dict) -> subprocess.Popen:
+    """Streamlit on port, its output appended to logs/streamlit-<port>.log so the pipe never fills up."""
+    LOG_DIR.mkdir(exist_ok=True)
+    log = open(LOG_DIR / f"streamlit-{port}.log", "ab")
+    python = "python" if getattr(sys, "frozen", False) else sys.executable
+    process = subprocess.Popen(
+        [python, "-m", "streamlit", "run", "app.py", "--server.headless", "true", "--server.port", str(port)],
+        stdout=log,
+        stderr=subprocess.STDOUT,
+        env=env,
+    )
+    log.close()  # the child keeps its own handle
+    return process
+
+
+def wait_healthy(process: subprocess.Popen, port: int, timeout: float = 120.0) -> bool:
+    """Poll the health endpoint with growing pauses until it answers; False if the server died or timed out."""
+    deadline = time.monotonic() + timeout
+    pause = 0.05
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            return False
+        for path in HEALTH_PATHS:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}{path}", timeout=1) as response:
+                    if response.status == 200:
+                        return True
+            except OSError:
+                pass
+        time.sleep(pause)
+        pause = min(pause * 1.5, 1.0)
+    return False
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Start the Stellar Dance interface and open it in the browser.")
+    parser.add_argument("--instances", type=int, default=1, help="number of app servers, each on its own port")
+    parser.add_argument("--prewarm", action="store_true", help="load the database clients before the first lookup")
+    parser.add_argument("--no-browser", action="store_true", help="do not open the browser")
+    args = parser.parse_args(argv)
+
+    print("🚀 Launching Stellar Dance Interface...")
+    print(f"Project folder: {project_path}")
 
-process = subprocess.Popen(
-    ["python", "-m", "streamlit", "run", "app.py", "--server.headless", "true"],
-    stdout=subprocess.PIPE,
-    stderr=subprocess.PIPE
-)
+    env = dict(os.environ)
+    if args.prewarm:
+        env["STELLAR_DANCE_PREWARM"] = "1"  # load the database clients before the first lookup
 
-time.sleep(3)
+    servers = {}  # port -> process
+    envs = {}  # port -> environment of that instance, kept for restarts
+    for _ in range(max(1, args.instances)):
+        port = free_port(set(servers))
+        control_port = free_port({int(e[control.PORT_ENV]) for e in envs.values()}, CONTROL_PORTS)
+        envs[port] = {**env, control.PORT_ENV: str(control_port), control.TOKEN_ENV: secrets.token_hex(16)}
+        print(f"Starting Streamlit server on port {port} (log: {LOG_DIR / f'streamlit-{port}.log'})...")
+        servers[port] = start_server(port, envs[port])
 
-webbrowser.open("http://localhost:8501")
+    started = time.monotonic()
+    for port, process in servers.items():
+        if not wait_healthy(process, port):
+            print(f"⚠️ The server on port {port} did not start; see its log.")
+            continue
+        print(f"Ready on http://localhost:{port} after {time.monotonic() - started:.1f} s")
+        if not args.no_browser:
+            webbrowser.open(f"http://localhost:{port}")
 
-process.wait()
+    # supervise: a server that exits on its own is started again on the same port
+    try:
+        while servers:
+            time.sleep(1)
+            for port, process in list(servers.items()):
+                if process.poll() is None:
+                    continue
+                print(f"Server on port {port} exited with code {process.returncode}; restarting it.")
+                servers[port] = start_server(port, envs[port])
+                if not wait_healthy(servers[port], port):
+                    print(f"⚠️ The server on port {port} does not come back; giving up on it.")
+                    del servers[port]
+    except KeyboardInterrupt:
+        print("Stopping...")
+    finally:
+        for process in servers.values():
+            process.terminate()
+        for process in servers.values():
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
 
 
+if __name__ == "__main__":
+    main()
@@ -5,7 +5,7 @@ a = Analysis(
     ['start.py'],
     pathex=[],
     binaries=[],
-    datas=[('app.py', '.'), ('gravity.py', '.'), ('user_stars.json', '.')],
+    datas=[('app.py', '.'), ('gravity.py', '.'), ('barnes_hut.py', '.'), ('tiles.py', '.'), ('contacts.py', '.'), ('recording.py', '.'), ('control.py', '.'), ('live.py', '.'), ('live_canvas', 'live_canvas'), ('lookup_cache.py', '.'), ('host_table.py', '.'), ('queries.py', '.'), ('startup.py', '.'), ('profiler.py', '.'), ('user_stars.json', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
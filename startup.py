@@ -0,0 +1,84 @@
+"""Start-up helpers: deferred imports, pre-warming and an import time report.
+
+    python startup.py                       # import time of what app.py loads at start
+    python startup.py astroquery.simbad     # or of any modules
+
+lazy_import returns a module whose code only runs on first attribute access, so a
+dependency needed by a few code paths costs nothing until one of them runs.
+"""
+from __future__ import annotations
+import argparse
+import importlib
+import importlib.util
+import subprocess
+import sys
+import threading
+
+APP_MODULES = ("streamlit", "gravity", "control", "live", "lookup_cache", "host_table", "queries")
+PREWARM_MODULES = ("astroquery.nasa_exoplanet_archive", "astroquery.simbad")  # first database lookup
+
+
+def lazy_import(name: str):
+    """Module `name`, executed on first attribute access; ImportError right away if it is not installed."""
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def prewarm(names: tuple[str, ...] = PREWARM_MODULES) -> threading.Thread:
+    """Import modules in a background thread, so the first user to need them does not wait."""
+    def run():
+        for name in names:
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass  # the feature reports the missing module when it is used
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def import_report(names: tuple[str, ...] = APP_MODULES) -> list[tuple[str, float, float]]:
+    """(module, own seconds, cumulative seconds) of every module a fresh interpreter imports for names.
+
+    Uses python -X importtime, so modules already imported by the interpreter itself are not
+    counted. Sorted by cumulative time, slowest first.
+    """
+    code = "; ".join(f"import {name}" for name in names)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        # import time:     self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, module = (part.strip() for part in line[len("import time:"):].split("|"))
+        if own.isdigit():
+            rows.append((module, int(own) / 1e6, int(cumulative) / 1e6))
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    return sorted(rows, key=lambda row: -row[2])
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Import time of the app's start-up modules, by module.")
+    parser.add_argument("modules", nargs="*", default=APP_MODULES, help=f"modules to import (default: {' '.join(APP_MODULES)})")
+    parser.add_argument("--top", type=int, default=25, help="number of modules listed")
+    args = parser.parse_args(argv)
+
+    rows = import_report(tuple(args.modules))
+    roots = [row for row in rows if row[0] in args.modules]
+    print(f"{'module':50} {'self ms':>9} {'total ms':>9}")
+    for module, own, cumulative in rows[:args.top]:
+        print(f"{module:50} {own * 1000:9.1f} {cumulative * 1000:9.1f}")
+    print(f"\ntotal for {', '.join(args.modules)}: {sum(row[2] for row in roots) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
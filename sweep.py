@@ -0,0 +1,251 @@
+"""Parameter sweeps of the three-star setup, run headless on all cores.
+
+    python sweep.py --param mass3=1e30:9e30:9 --param inner_distance=5e9:2e10:4 --seconds 3e8 --out map.csv
+
+A parameter is given as name=start:stop:count (evenly spaced), name=start:stop:count:log
+(geometric) or name=v1,v2,...; the sweep runs every combination. Names are mass1..3 and
+radius1..3 (kg, m), inner_distance, outer_distance (m) and time_speed. Each finished run
+is appended to the CSV at once, and a rerun with the same --out skips the runs already
+there, so an interrupted sweep can be resumed.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import gravity
+
+OUTCOMES = ("merger", "ejection", "mass_transfer", "stable")
+STAR_PARAMS = {f"{field}{i + 1}": (i, key) for i in range(3) for field, key in (("mass", "mass"), ("radius", "radius"))}
+TOP_PARAMS = ("inner_distance", "outer_distance", "time_speed")
+FIELDS = ("key", "outcome", "decided_tick", "simulated_seconds", "stars_end", "wall_seconds")
+
+# the defaults of gravity.three_body, as a config
+BASE_CONFIG = {
+    "time_speed": 5000,
+    "stars": [
+        {"mass": 2.27 * gravity.MS, "radius": 2.84 * gravity.RS, "color": "blue"},
+        {"mass": 2.30 * gravity.MS, "radius": 2.85 * gravity.RS, "color": "yellow"},
+        {"mass": 4.4 * gravity.MS, "radius": 0.8 * gravity.RS, "color": "green"},
+    ],
+}
+
+
+def parse_param(text: str) -> tuple[str, list[float]]:
+    """'name=start:stop:count[:log]' or 'name=v1,v2,...' -> (name, values)."""
+    name, _, spec = text.partition("=")
+    if name not in STAR_PARAMS and name not in TOP_PARAMS:
+        raise ValueError(f"Unknown parameter {name!r}.")
+    if ":" in spec:
+        parts = spec.split(":")
+        start, stop, count = float(parts[0]), float(parts[1]), int(parts[2])
+        values = np.geomspace(start, stop, count) if parts[3:] == ["log"] else np.linspace(start, stop, count)
+        return name, [float(v) for v in values]
+    return name, [float(v) for v in spec.split(",")]
+
+
+def make_config(base: dict, params: dict) -> dict:
+    config = json.loads(json.dumps(base))
+    for name, value in params.items():
+        if name in STAR_PARAMS:
+            i, key = STAR_PARAMS[name]
+            config["stars"][i][key] = value
+        else:
+            config[name] = value
+    return config
+
+
+def run_key(params: dict) -> str:
+    return ";".join(f"{name}={value!r}" for name, value in params.items())
+
+
+def ticks_for(config: dict, seconds: float) -> int:
+    """Ticks that cover seconds of simulated time at the config's own time_speed."""
+    return math.ceil(seconds / (config.get("time_speed", 5000) / gravity.fps))
+
+
+def _ejected(stars: gravity.Stars, size: float) -> bool:
+    """Some star is unbound from the rest and farther than 10 initial system sizes from them."""
+    for i in range(len(stars)):
+        others = np.arange(len(stars)) != i
+        m = stars.mass[others].sum()
+        com = (stars.mass[others, None] * stars.pos[others]).sum(axis=0) / m
+        com_speed = (stars.mass[others, None] * stars.speed[others]).sum(axis=0) / m
+        d = math.hypot(*(stars.pos[i] - com))
+        v2 = float(((stars.speed[i] - com_speed) ** 2).sum())
+        if d > 10 * size and v2 / 2 - gravity.G * (m + stars.mass[i]) / d > 0:
+            return True
+    return False
+
+
+def run_one(key: str, config: dict, ticks: int, check_every: int = 100) -> dict:
+    """Integrate one configuration until its outcome is decided or ticks run out."""
+    tm = time.perf_counter()
+    stars = gravity.load_config(config)
+    n_start = len(stars)
+    com = (stars.mass[:, None] * stars.pos).sum(axis=0) / stars.mass.sum()
+    size = float(np.hypot(*(stars.pos - com).T).max())
+
+    outcome, decided = "stable", None
+    for tick in range(1, ticks + 1):
+        stars = gravity.simulate_one_tick(stars)
+        if len(stars) < n_start:
+            outcome = "merger"
+        elif stars.exchanges:
+            outcome = "mass_transfer"
+        elif tick % check_every == 0 and _ejected(stars, size):
+            outcome = "ejection"
+        if outcome != "stable":
+            decided = tick
+            break
+
+    return {
+        "key": key,
+        "outcome": outcome,
+        "decided_tick": decided,
+        "simulated_seconds": stars.time,
+        "stars_end": len(stars),
+        "wall_seconds": time.perf_counter() - tm,
+    }
+
+
+def run_batch(keys: list[str], configs: list[dict], ticks: int | list[int], check_every: int = 100) -> list[dict]:
+    """Like run_one for many configurations at once, integrated together as a gravity.Ensemble.
+
+    ticks is one count for all runs or one per run; a run stops when its own count is reached.
+    """
+    tm = time.perf_counter()
+    systems, dt = [], []
+    for config in configs:
+        systems.append(gravity.load_config(config))
+        dt.append(gravity.time_speed / gravity.fps)
+    dt = np.array(dt)
+    sizes = []
+    for stars in systems:
+        com = (stars.mass[:, None] * stars.pos).sum(axis=0) / stars.mass.sum()
+        sizes.append(float(np.hypot(*(stars.pos - com).T).max()))
+    ens = gravity.Ensemble(systems)
+    ticks = np.broadcast_to(np.asarray(ticks, dtype=np.int64), (len(keys),))
+
+    outcome = np.array(["stable"] * len(keys), dtype=object)
+    decided = [None] * len(keys)
+    for tick in range(1, int(ticks.max(initial=0)) + 1):
+        if not ens.active.any():
+            break
+        was_active = ens.active.copy()
+        gravity.simulate_ensemble_tick(ens, dt)
+        outcome[was_active & (ens.merges > 0)] = "merger"
+        outcome[was_active & (ens.merges == 0) & ens.exchanged] = "mass_transfer"
+        if tick % check_every == 0:
+            for s in np.flatnonzero(was_active & (outcome == "stable")):
+                if _ejected(ens.system(s), sizes[s]):
+                    outcome[s] = "ejection"
+        for s in np.flatnonzero(was_active & (outcome != "stable")):
+            decided[s] = tick
+            ens.active[s] = False
+        ens.active[ticks == tick] = False  # out of ticks, still stable
+
+    wall = (time.perf_counter() - tm) / len(keys)
+    return [
+        {
+            "key": key,
+            "outcome": outcome[s],
+            "decided_tick": decided[s],
+            "simulated_seconds": float(ens.time[s]),
+            "stars_end": int(ens.alive[s].sum()),
+            "wall_seconds": wall,
+        }
+        for s, key in enumerate(keys)
+    ]
+
+
+def sweep(grid: dict[str, list[float]], out: str, ticks: int | None, base: dict = BASE_CONFIG,
+          workers: int | None = None, batch: int = 64, seconds: float | None = None) -> None:
+    """Run every combination of the grid on a process pool, appending one CSV row per run to out.
+
+    Runs last ticks ticks, or with ticks None seconds of simulated time, converted to ticks
+    per run so that a swept time_speed does not change how long a run simulates.
+
+    Each task integrates batch runs together (run_batch); batch 1 runs them one by one with
+    simulate_one_tick (run_one), which honours the integrator and kepler settings of the config.
+    """
+    names = list(grid)
+    header = list(FIELDS[:1]) + names + list(FIELDS[1:])
+    done = set()
+    if os.path.exists(out):
+        with open(out, "r", newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if reader.fieldnames and reader.fieldnames != header:
+                raise ValueError(f"{out} was written by a sweep over other parameters.")
+            done = {row["key"] for row in reader}
+
+    todo = []
+    for values in itertools.product(*(grid[n] for n in names)):
+        params = dict(zip(names, values))
+        key = run_key(params)
+        if key not in done:
+            todo.append((key, params))
+    total = len(todo) + len(done)
+    print(f"{len(done)} of {total} runs already done, {len(todo)} to go")
+
+    new_file = not done and not (os.path.exists(out) and os.path.getsize(out))
+    with open(out, "a", newline="", encoding="utf-8") as f, ProcessPoolExecutor(max_workers=workers) as pool:
+        writer = csv.DictWriter(f, fieldnames=header)
+        if new_file:
+            writer.writeheader()
+        futures = {}
+        for a in range(0, len(todo), batch):
+            chunk = todo[a:a + batch]
+            configs = [make_config(base, params) for _, params in chunk]
+            counts = [ticks if ticks is not None else ticks_for(config, seconds) for config in configs]
+            if batch == 1:
+                future = pool.submit(run_one, chunk[0][0], configs[0], counts[0])
+            else:
+                future = pool.submit(run_batch, [key for key, _ in chunk], configs, counts)
+            futures[future] = chunk
+        finished = len(done)
+        try:
+            for future in as_completed(futures):
+                rows = future.result()
+                for row, (_, params) in zip(rows if isinstance(rows, list) else [rows], futures[future]):
+                    writer.writerow({**row, **params})
+                f.flush()
+                finished += len(futures[future])
+                print(f"\r{finished}/{total}", end="", flush=True)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            print("\nInterrupted; run again with the same --out to resume.")
+            raise
+    print()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Sweep three-star parameters and classify the outcomes.")
+    parser.add_argument("--param", action="append", required=True, help="name=start:stop:count[:log] or name=v1,v2")
+    length = parser.add_mutually_exclusive_group(required=True)
+    length.add_argument("--ticks", type=int, help="ticks per run")
+    length.add_argument("--seconds", type=float, help="simulated seconds per run")
+    parser.add_argument("--base", help="user_stars.json-style config with three stars to start from")
+    parser.add_argument("--workers", type=int, help="processes (default: all cores)")
+    parser.add_argument("--batch", type=int, default=64,
+                        help="runs integrated together per task (default 64); 1 uses the configured integrator")
+    parser.add_argument("--out", default="sweep.csv", help="results table (CSV), also used to resume")
+    args = parser.parse_args(argv)
+
+    base = BASE_CONFIG
+    if args.base:
+        with open(args.base, "r", encoding="utf-8") as f:
+            base = json.load(f)
+    grid = dict(parse_param(p) for p in args.param)
+    sweep(grid, args.out, args.ticks, base, args.workers, max(args.batch, 1), args.seconds)
+
+
+if __name__ == "__main__":
+    main()
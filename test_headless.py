@@ -0,0 +1,28 @@
+"""Headless runs depend only on their own config, not on what ran before them."""
+import pytest
+
+import gravity
+import headless
+
+
+def test_runs_do_not_inherit_settings():
+    before = headless.run({}, ticks=20)
+    headless.run({"integrator": "rk45", "solver": "barnes_hut", "eta": 0.5, "kepler": False}, ticks=5)
+    gravity.load_config({"integrator": "hermite", "trail_length": 10})
+    after = headless.run({}, ticks=20)
+    assert after["stars"] == before["stars"]
+    assert after["stats"]["simulated_seconds"] == before["stats"]["simulated_seconds"]
+
+
+def test_load_config_resets_left_out_settings():
+    gravity.load_config({"integrator": "rk45", "solver": "barnes_hut", "trail_length": 10})
+    gravity.load_config({})
+    assert {name: getattr(gravity, name) for name in gravity.DEFAULTS} == gravity.DEFAULTS
+
+
+def test_unknown_names_are_rejected():
+    for config in ({"solver": "barnes-hut"}, {"integrator": "leapfrg"}):
+        with pytest.raises(ValueError):
+            gravity.load_config(config)
+        with pytest.raises(ValueError):
+            gravity.Settings(config)
@@ -0,0 +1,37 @@
+"""Live simulations of several sessions run in one process and must not share settings."""
+import time
+
+import gravity
+import live
+
+
+def _frames(sim: live.LiveSimulation, count: int, timeout: float = 10.0) -> list:
+    deadline = time.monotonic() + timeout
+    frames = []
+    while len(frames) < count and time.monotonic() < deadline:
+        frames = sim.fetch(-1)[1]
+        time.sleep(0.05)
+    assert len(frames) >= count, "the simulation thread produced too few frames"
+    return frames
+
+
+def test_simulations_keep_their_own_settings():
+    defaults = {name: getattr(gravity, name) for name in gravity.SIMULATION_SETTINGS}
+    slow = live.LiveSimulation({"time_speed": 2000, "integrator": "rk45", "kepler": False})
+    fast = live.LiveSimulation({"time_speed": 30000, "integrator": "hermite", "kepler": False})
+    try:
+        slow_frames, fast_frames = _frames(slow, 3), _frames(fast, 3)
+    finally:
+        slow.stop()
+        fast.stop()
+
+    assert (slow.settings.time_speed, slow.settings.integrator) == (2000, "rk45")
+    assert (fast.settings.time_speed, fast.settings.integrator) == (30000, "hermite")
+    # each advances by its own time_speed per frame
+    for sim, frames in ((slow, slow_frames), (fast, fast_frames)):
+        steps = [b[0] - a[0] for a, b in zip(frames, frames[1:])]
+        assert all(abs(step - sim.settings.time_speed / live.FRAME_RATE) < 1e-6 * step for step in steps)
+    # only rk45 keeps a step size between frames
+    assert slow._stars.step is not None
+    assert fast._stars.step is None
+    assert {name: getattr(gravity, name) for name in gravity.SIMULATION_SETTINGS} == defaults
@@ -0,0 +1,50 @@
+"""Recordings read back exactly what was written."""
+import os
+
+import numpy as np
+
+import gravity
+import recording
+
+
+def _record(path, ticks: int) -> list:
+    stars = gravity.three_body()
+    states = []
+    with recording.Recorder(str(path)) as rec:
+        for tick in range(ticks):
+            rec.write(stars, tick)
+            states.append((tick, stars.time, stars.pos.copy(), stars.mass.copy(), list(stars.color)))
+            stars = gravity.simulate_one_tick(stars)
+    return states
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "run.rec"
+    states = _record(path, 5)
+    replay = recording.Replay(str(path))
+    assert replay.colors == ["green", "yellow", "blue"]
+    assert list(replay.ticks) == [tick for tick, *_ in states]
+    for f, (tick, time, pos, mass, color) in enumerate(states):
+        frame = replay.frame(f)
+        assert (frame.tick, frame.time, frame.color) == (tick, time, color)
+        np.testing.assert_array_equal(frame.pos, pos)
+        np.testing.assert_array_equal(frame.mass, mass)
+
+
+def test_index_rebuilt_from_data(tmp_path):
+    path = tmp_path / "run.rec"
+    states = _record(path, 3)
+    os.remove(str(path) + ".idx")
+    replay = recording.Replay(str(path))
+    assert replay.colors == ["green", "yellow", "blue"]
+    assert len(replay) == len(states)
+    np.testing.assert_array_equal(replay.frame(2).pos, states[2][2])
+
+
+def test_new_run_replaces_recording(tmp_path):
+    path = tmp_path / "run.rec"
+    _record(path, 5)
+    _record(path, 3)
+    replay = recording.Replay(str(path))
+    assert list(replay.ticks) == [0, 1, 2]
+    assert replay.seek(2) == 2
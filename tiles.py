@@ -0,0 +1,132 @@
+from __future__ import annotations
+import atexit
+import math
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+BLOCK_ELEMENTS = 4_000_000  # pairs per tile, keeps the pairwise arrays of one tile small
+IN_COLUMNS = 5  # x, y, vx, vy, mass
+OUT_COLUMNS = 5  # ax, ay, jx, jy, nearest
+
+
+def pair_forces(pos: np.ndarray, vel: np.ndarray | None, mass: np.ndarray, rows: np.ndarray, G: float):
+    """Direct-summation accelerations of the stars in rows against all stars.
+
+    Returns (acc, jerk, nearest); jerk is None without vel.
+    """
+    dif = pos[None, :, :] - pos[rows, None, :]
+    d = np.hypot(dif[..., 0], dif[..., 1])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        w = np.where(d > 0, G * mass[None, :] / d ** 3, 0.0)
+    acc = np.einsum("ij,ijk->ik", w, dif)
+    nearest = np.where(d > 0, d, np.inf).min(axis=1)
+
+    jerk = None
+    if vel is not None:
+        dv = vel[None, :, :] - vel[rows, None, :]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rv = np.where(d > 0, 3 * np.einsum("ijk,ijk->ij", dif, dv) / d ** 2, 0.0)
+        jerk = np.einsum("ij,ijk->ik", w, dv) - np.einsum("ij,ijk->ik", w * rv, dif)
+    return acc, jerk, nearest
+
+
+class TilePool:
+    """Persistent worker processes computing pair_forces tile by tile.
+
+    Star data and results live in one shared memory block, so a tick only sends the
+    tile bounds to the workers.
+    """
+
+    def __init__(self, workers: int) -> None:
+        self.workers = workers
+        self._pool = ProcessPoolExecutor(max_workers=workers)
+        self._shm = None
+        self._capacity = 0
+        atexit.register(self.close)
+
+    def _views(self, capacity: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        if capacity > self._capacity:
+            # grow geometrically so slowly changing star counts do not reallocate every tick
+            # (computed before _release, which resets the capacity)
+            capacity = max(capacity, int(self._capacity * 1.5))
+            self._release()
+            self._capacity = capacity
+            self._shm = shared_memory.SharedMemory(create=True, size=_shared_size(self._capacity))
+        return _split(self._shm.buf, self._capacity)
+
+    def forces(self, pos: np.ndarray, vel: np.ndarray | None, mass: np.ndarray, rows: np.ndarray, G: float):
+        """Same result as pair_forces, computed in parallel tiles of rows."""
+        n = len(mass)
+        inputs, row_buf, outputs = self._views(n)
+        inputs[:n, 0:2] = pos
+        if vel is not None:
+            inputs[:n, 2:4] = vel
+        inputs[:n, 4] = mass
+        row_buf[:len(rows)] = rows
+
+        # a few tiles per worker so an uneven machine load still balances out
+        tile = max(1, min(BLOCK_ELEMENTS // max(n, 1), math.ceil(len(rows) / (4 * self.workers))))
+        futures = [
+            self._pool.submit(_tile, self._shm.name, self._capacity, n, a, min(a + tile, len(rows)),
+                              vel is not None, G)
+            for a in range(0, len(rows), tile)
+        ]
+        for f in futures:
+            f.result()
+
+        m = len(rows)
+        acc = outputs[:m, 0:2].copy()
+        jerk = outputs[:m, 2:4].copy() if vel is not None else None
+        nearest = outputs[:m, 4].copy()
+        return acc, jerk, nearest
+
+    def _release(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+            self._capacity = 0
+
+    def close(self) -> None:
+        self._pool.shutdown(cancel_futures=True)
+        self._release()
+
+
+def _shared_size(capacity: int) -> int:
+    return capacity * (IN_COLUMNS + 1 + OUT_COLUMNS) * 8
+
+
+def _split(buf, capacity: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Input, row index and output arrays laid out in a shared block."""
+    inputs = np.ndarray((capacity, IN_COLUMNS), dtype=np.float64, buffer=buf)
+    rows = np.ndarray((capacity,), dtype=np.int64, buffer=buf, offset=capacity * IN_COLUMNS * 8)
+    outputs = np.ndarray((capacity, OUT_COLUMNS), dtype=np.float64, buffer=buf,
+                         offset=capacity * (IN_COLUMNS + 1) * 8)
+    return inputs, rows, outputs
+
+
+_attached = {}  # worker side: name -> SharedMemory of the current block
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    shm = _attached.get(name)
+    if shm is None:
+        for old in _attached.values():
+            old.close()
+        _attached.clear()
+        shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    return shm
+
+
+def _tile(name: str, capacity: int, n: int, a: int, b: int, with_vel: bool, G: float) -> None:
+    """Worker: forces for rows[a:b], written to the shared outputs."""
+    inputs, rows, outputs = _split(_attach(name).buf, capacity)
+    data = inputs[:n]
+    acc, jerk, nearest = pair_forces(data[:, 0:2], data[:, 2:4] if with_vel else None, data[:, 4], rows[a:b], G)
+    outputs[a:b, 0:2] = acc
+    if jerk is not None:
+        outputs[a:b, 2:4] = jerk
+    outputs[a:b, 4] = nearest